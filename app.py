@@ -1,6 +1,7 @@
 # Hauptanwendung Streamlit
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from datetime import datetime
 
@@ -24,11 +25,17 @@ from pdf_export import HAS_REPORTLAB, build_pdf_report
 
 from recommender import (
     load_catalog,
-    enrich_with_policies,
-    llm_actions_from_policy_hits,
-    build_query_for_policy
+    enrich_many_with_policies,
+    llm_actions_many,
+    build_query_for_policy,
+    ActionStream,
+    LLM_STREAM,
+    LLM_TIMEOUT,
 )
-from policy_search import PolicySearch
+from policy_fts import FTSPolicySearch
+from policy_search import PolicySearch, ShardedPolicySearch
+from index_manager import IndexManager
+from llm_cache import get_cache
 import theme
 
 # Speicher-Status (Session)
@@ -75,25 +82,6 @@ if "fine_tuning_version" not in st.session_state:
     st.session_state.fine_tuning_version = 0
 
 
-# PDF-Libs 
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.units import cm
-    from reportlab.lib import colors
-    from reportlab.platypus import (
-        SimpleDocTemplate,
-        Paragraph,
-        Spacer,
-        Table,
-        TableStyle,
-        Image as RLImage,
-    )
-    from reportlab.lib.styles import getSampleStyleSheet
-    HAS_REPORTLAB = True
-except:
-    HAS_REPORTLAB = False
-
-
 # Grundlayout 
 st.set_page_config(page_title="Risikoanalyse", layout="wide")
 theme.init_theme_state()
@@ -111,10 +99,35 @@ def cached_catalog():
 @st.cache_resource(show_spinner=False)
 def cached_policy():
     os.makedirs("policies", exist_ok=True)
-    return PolicySearch("policies")
+    chunk_chars = int(os.getenv("POLICY_CHUNK_CHARS", "0") or 0)
+    # Vorab gebautes Artefakt (build_index.py): nur lesend laden, keine PDFs parsen
+    artifact = os.getenv("POLICY_INDEX_PATH", "").strip()
+    if artifact:
+        return PolicySearch("policies", index_path=artifact, read_only=True)
+    # Mehrere Server-Prozesse: nur einer baut, die übrigen hängen sich per mmap an den Index
+    read_only = os.getenv("POLICY_INDEX_READONLY", "") == "1"
+    layout = os.getenv("POLICY_INDEX_LAYOUT", "")
+    # Near-Duplicate-Seiten zusammenfassen (zusätzlicher MinHash-Durchlauf bei jedem Aufbau)
+    dedup = os.getenv("POLICY_DEDUP", "") == "1"
+    # Seiten in SQLite/FTS5: kein Index im Speicher, PDFs werden einzeln eingefügt/gelöscht
+    if layout == "sqlite":
+        return FTSPolicySearch("policies", workers=os.cpu_count() or 1)
+    if layout == "sharded":
+        return ShardedPolicySearch("policies", workers=os.cpu_count() or 1, chunk_chars=chunk_chars or None,
+                                   read_only=read_only, dedup=dedup)
+    return PolicySearch("policies", workers=os.cpu_count() or 1, chunk_chars=chunk_chars or None,
+                        read_only=read_only, dedup=dedup)
+
+# Gemeinsamer Halter der aktuellen Index-Generation für alle Sessions
+@st.cache_resource(show_spinner=False)
+def cached_index_manager():
+    return IndexManager(cached_policy())
 
 catalog = cached_catalog()
-policy_search = cached_policy()
+index_manager = cached_index_manager()
+policy_search = index_manager.current
+if "policy_generation" not in st.session_state:
+    st.session_state.policy_generation = index_manager.generation
 
 # SIDEBAR
 st.sidebar.title("📁 Datenverwaltung")
@@ -225,19 +238,41 @@ with st.sidebar.expander("📤  Import & Export", expanded=False):
 with st.sidebar.expander("📚 Policies & Index", expanded=False):
     st.subheader("Policy-Index aktualisieren")
     
-    if st.button("🔄 Index neu aufbauen", use_container_width=True):
-        try:
-            st.session_state.pop("policy_search", None)
-            st.cache_resource.clear()
-    
-            policy_search = cached_policy()
-    
-            st.success("Policy-Index erfolgreich aktualisiert.")
+    reindex_running = index_manager.status()["running"]
+    if st.button("🔄 Index neu aufbauen", use_container_width=True, disabled=reindex_running):
+        index_manager.start_rebuild()
+        st.rerun()
+
+    # Fortschritt des Hintergrund-Jobs; aktualisiert sich selbst, solange er läuft
+    def _render_reindex_status():
+        status = index_manager.status()
+        if status["running"]:
+            total = max(int(status["total"]), 1)
+            st.progress(min(int(status["done"]) / total, 1.0), text=f"Indexiere: {status['label']}")
+        elif status["error"]:
+            # Fragment pollt noch (run_every aus dem letzten Lauf): einmal komplett neu laden, damit es endet
+            if reindex_running:
+                st.rerun()
+            st.error(f"Fehler beim Aktualisieren: {status['error']}")
+        elif st.session_state.policy_generation != index_manager.generation:
+            st.session_state.policy_generation = index_manager.generation
             st.rerun()
-    
-        except Exception as e:
-            st.error(f"Fehler beim Aktualisieren: {e}")
-            
+        elif status["finished_at"]:
+            st.success("Policy-Index erfolgreich aktualisiert.")
+
+    st.fragment(_render_reindex_status, run_every=1.0 if reindex_running else None)()
+
+    if hasattr(policy_search, "cache_stats"):
+        hc = policy_search.cache_stats()["hits"]
+        st.caption(f"Such-Cache: {hc['hits']} Treffer / {hc['misses']} Fehlgriffe ({hc['size']} Einträge)")
+    if hasattr(policy_search, "memory_report"):
+        mem = policy_search.memory_report()
+        st.caption(f"Index-Speicher: {mem['shared'] / 1e6:.1f} MB geteilt (mmap) / {mem['private'] / 1e6:.1f} MB privat")
+    llm_cache = get_cache()
+    if llm_cache is not None:
+        lc = llm_cache.stats()
+        st.caption(f"KI-Cache: {lc['hits']} Treffer / {lc['misses']} Fehlgriffe ({lc['size']} Einträge, persistent)")
+
     st.markdown("---")
     st.subheader("Geladene Policies")
     
@@ -251,8 +286,12 @@ with st.sidebar.expander("📚 Policies & Index", expanded=False):
     if not policy_files:
         st.info("Keine Policies gefunden.")
     else:
+        timings = getattr(ps, "ingest_timings", {}) or {}
         for f in policy_files:
-            st.markdown(f"- **{f}**")
+            if f in timings:
+                st.markdown(f"- **{f}** ({timings[f]:.1f} s)")
+            else:
+                st.markdown(f"- **{f}**")
 
 
 col_head, col_theme = st.columns([7, 1])
@@ -1291,38 +1330,87 @@ with tab_recommendations:
         st.header("🛠 Handlungsempfehlungen")
         st.caption("Basierend auf den identifizierten Schwachstellen und Policies.")
 
-        for _, row in vuln_df.iterrows():
+        vuln_rows = [row for _, row in vuln_df.iterrows()]
+        all_hits = enrich_many_with_policies(
+            policy_search,
+            [(row["ThreatNames"][0], row["Schwachstelle"], row["AssetNames"][0]) for row in vuln_rows],
+        )
+
+        # Fehlende Empfehlungen: gemeinsam (parallel) vorab, oder die erste gestreamt direkt im
+        # Expander, während die übrigen parallel im Hintergrund entstehen
+        pending = {}
+        for row, hits in zip(vuln_rows, all_hits):
+            cache_key = (row["Schwachstelle"], row["ThreatNames"][0], row["AssetNames"][0])
+            if cache_key not in st.session_state.rec_cache and cache_key not in pending:
+                ctx = {
+                    "asset": cache_key[2], "threat": cache_key[1], "vuln": cache_key[0],
+                    "risk": float(row["Risk"]), "likelihood": float(row["Avg_Likelihood"]),
+                    "impact": float(row["Avg_Impact"]) if "Avg_Impact" in row else 0.0
+                }
+                pending[cache_key] = (hits, ctx)
+        if pending and not LLM_STREAM:
+            with st.spinner(f"Generiere Maßnahmen für {len(pending)} Schwachstellen..."):
+                results = llm_actions_many(list(pending.values()), max_chars=3000, return_hits=True)
+            for cache_key, res in zip(pending, results):
+                # Fehlgeschlagene Anfragen nicht merken, beim nächsten Durchlauf erneut versuchen
+                if res is not None:
+                    st.session_state.rec_cache[cache_key] = res
+        stream_key, background = None, None
+        if pending and LLM_STREAM:
+            stream_key, *rest = pending
+            if rest:
+                pool = ThreadPoolExecutor(max_workers=1)
+                background = pool.submit(llm_actions_many, [pending[k] for k in rest],
+                                         max_chars=3000, return_hits=True)
+                pool.shutdown(wait=False)
+
+        for row, hits in zip(vuln_rows, all_hits):
             nr = int(row["Nr"])
             vuln_name = row["Schwachstelle"]
             vid = row["VulnID"]
             first_threat = row["ThreatNames"][0]
             first_asset = row["AssetNames"][0]
 
-            with st.expander(f"#{nr} – {vuln_name}"):
+            cache_key = (vuln_name, first_threat, first_asset)
+            streaming = cache_key == stream_key and cache_key not in st.session_state.rec_cache
+            if background is not None and cache_key in pending and not streaming \
+                    and cache_key not in st.session_state.rec_cache:
+                with st.spinner(f"Generiere Maßnahmen für {len(pending) - 1} Schwachstellen..."):
+                    results = background.result()
+                background = None
+                for key, res in zip(rest, results):
+                    if res is not None:
+                        st.session_state.rec_cache[key] = res
+
+            # Gerade gestreamte Empfehlung aufgeklappt, damit der Text sofort sichtbar ist
+            with st.expander(f"#{nr} – {vuln_name}", expanded=streaming):
                 if st.checkbox("✅ Als umgesetzt markieren", key=f"comp_{vid}_{st.session_state.widget_version}"):
                     st.session_state.completed_actions.add(vid)
                     st.rerun()
 
-                hits = enrich_with_policies(policy_search, first_threat, vuln_name, first_asset)
-                
-                cache_key = (vuln_name, first_threat, first_asset)
-                if cache_key not in st.session_state.rec_cache:
-                    ctx = {
-                        "asset": first_asset, "threat": first_threat, "vuln": vuln_name,
-                        "risk": float(row["Risk"]), "likelihood": float(row["Avg_Likelihood"]),
-                        "impact": float(row["Avg_Impact"]) if "Avg_Impact" in row else 0.0
-                    }
-                    with st.spinner("Generiere Maßnahmen..."):
-                        md, main_source = llm_actions_from_policy_hits(hits, ctx, max_chars=3000, return_hits=True)
-                    st.session_state.rec_cache[cache_key] = (md, main_source)
-                
-                cached_md, cached_source = st.session_state.rec_cache[cache_key]
-                st.markdown(cached_md)
+                if streaming:
+                    stream = ActionStream(*pending[cache_key], timeout=LLM_TIMEOUT)
+                    try:
+                        st.write_stream(stream)
+                    except Exception:
+                        st.warning("⚠️ Empfehlung konnte nicht erzeugt werden (Zeitüberschreitung oder API-Fehler).")
+                        continue
+                    st.session_state.rec_cache[cache_key] = stream.result
+                    cached_md, cached_source = stream.result
+                elif cache_key in st.session_state.rec_cache:
+                    cached_md, cached_source = st.session_state.rec_cache[cache_key]
+                    st.markdown(cached_md)
+                else:
+                    st.warning("⚠️ Empfehlung konnte nicht erzeugt werden (Zeitüberschreitung oder API-Fehler).")
+                    continue
                 
                 
                 if cached_source:
                     st.markdown("---")
                     st.markdown(f"**📄 Quelle:** {cached_source['file']} (Seite {cached_source['page']})")
+                    if cached_source.get("alternates"):
+                        also = ", ".join(f"{f} (Seite {p})" for f, p in cached_source["alternates"])
+                        st.caption(f"Nahezu gleicher Text auch in: {also}")
                     with st.expander("📖 Textauszug anzeigen"):
                         st.write(cached_source['snippet'])
 
@@ -0,0 +1,46 @@
+# Benchmark: BM25-Engine (Wort-Postings) gegen die TF-IDF-Suche (char-n-Gramme)
+#
+# Aufruf:  python benchmarks/bench_bm25.py [--policy-dir policies] [--k 7]
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from common import DEFAULT_CATALOG, DEFAULT_POLICY_DIR, overlap_at_k, policy_queries, report, timed
+from policy_search import PolicySearch
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--policy-dir", default=DEFAULT_POLICY_DIR)
+    ap.add_argument("--catalog", default=DEFAULT_CATALOG)
+    ap.add_argument("--k", type=int, default=7)
+    args = ap.parse_args()
+
+    queries = policy_queries(args.catalog)
+    tfidf = PolicySearch(args.policy_dir, query_cache_size=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Kopie des Index: Seitentexte werden übernommen, nur die Postings neu berechnet
+        bm25_path = os.path.join(tmp, "bm25.bin")
+        shutil.copy(tfidf.index_path, bm25_path)
+        t0 = time.perf_counter()
+        bm25 = PolicySearch(args.policy_dir, engine="bm25", index_path=bm25_path, query_cache_size=0)
+        build = time.perf_counter() - t0
+
+        ref = [tfidf.search(q, k=args.k) for q in queries]
+        alt = [bm25.search(q, k=args.k) for q in queries]
+
+        report("tfidf", timed(lambda q: tfidf.search(q, k=args.k), queries))
+        report("bm25", timed(lambda q: bm25.search(q, k=args.k), queries))
+
+        print(f"overlap@{args.k} bm25/tfidf: {overlap_at_k(ref, alt, args.k):.3f}")
+        print(f"BM25-Aufbau aus Seitentexten: {build:.2f}s  Terme: {len(bm25.vectorizer.terms)}  "
+              f"Postings: {bm25.vectorizer.docs.shape[0]}")
+        print(f"Index-Größe  tfidf: {os.path.getsize(tfidf.index_path) / 1e6:.1f} MB  "
+              f"bm25: {os.path.getsize(bm25_path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Benchmark: Kompaktierung des Index (float32, leere Zeilen, Feature-Beschneidung)
+#
+# Vergleicht Index-Größe, Aufbauzeit, Query-Latenz und Ranking (overlap@k gegen den
+# unkompaktierten Index) für mehrere Schwellen.
+#
+# Aufruf:  python benchmarks/bench_compact.py [--policy-dir policies] [--engine tfidf] [--k 7]
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from common import DEFAULT_CATALOG, DEFAULT_POLICY_DIR, catalog_queries, overlap_at_k, timed
+from policy_search import PolicySearch
+
+# (Bezeichnung, compact, prune_min_df, prune_min_weight)
+VARIANTS = [
+    ("ohne", False, 1, 0.0),
+    ("float32", True, 1, 0.0),
+    ("df>=2", True, 2, 0.0),
+    ("df>=3", True, 3, 0.0),
+    ("w>=0.01", True, 1, 0.01),
+    ("df>=2,w>=0.01", True, 2, 0.01),
+]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--policy-dir", default=DEFAULT_POLICY_DIR)
+    ap.add_argument("--catalog", default=DEFAULT_CATALOG)
+    ap.add_argument("--engine", default="tfidf", choices=("tfidf", "lsa", "hashing"))
+    ap.add_argument("--k", type=int, default=7)
+    args = ap.parse_args()
+
+    queries = catalog_queries(args.catalog)
+
+    rows = []
+    ref = None
+    with tempfile.TemporaryDirectory() as tmp:
+        # Seitentexte einmal bereitstellen (als schnell gebauter BM25-Index); jede Variante hat
+        # eine andere Konfiguration und indexiert aus ihrer Kopie neu, ohne PDFs erneut zu lesen
+        source_path = os.path.join(tmp, "source.bin")
+        shutil.copy(PolicySearch(args.policy_dir).index_path, source_path)
+        source = PolicySearch(args.policy_dir, engine="bm25", index_path=source_path)
+        for label, compact, min_df, min_weight in VARIANTS:
+            path = os.path.join(tmp, f"{len(rows)}.bin")
+            shutil.copy(source.index_path, path)
+            t0 = time.perf_counter()
+            ps = PolicySearch(args.policy_dir, engine=args.engine, index_path=path, query_cache_size=0,
+                              compact=compact, prune_min_df=min_df, prune_min_weight=min_weight)
+            build = time.perf_counter() - t0
+            hits = [ps.search(q, k=args.k) for q in queries]
+            if ref is None:
+                ref = hits
+            times = timed(lambda q: ps.search(q, k=args.k), queries)
+            rows.append((label, os.path.getsize(path), build, ps.X.shape, ps.X.nnz,
+                         statistics.mean(times) * 1000, overlap_at_k(ref, hits, args.k)))
+
+    base_size = rows[0][1]
+    print(f"{'Variante':<15} {'Größe':>9} {'Aufbau':>8} {'Zeilen':>7} {'Features':>9} {'nnz':>10} "
+          f"{'Query Ø':>9} {'overlap@' + str(args.k):>10}")
+    for label, size, build, shape, nnz, ms, overlap in rows:
+        print(f"{label:<15} {size / 1e6:7.1f}MB {build:7.2f}s {shape[0]:>7} {shape[1]:>9} {nnz:>10} "
+              f"{ms:7.2f}ms {overlap:>10.3f}   ({size / base_size:.0%} der Größe)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Benchmark: Near-Duplicate-Dedup (MinHash/LSH) – Index-Größe und Vielfalt der Top-k
+#
+# "redundant" zählt Treffer, deren Seite ein Near-Duplicate eines höher platzierten
+# Treffers derselben Liste ist (gemessen mit den Gruppen des Dedup-Laufs).
+#
+# Aufruf:  python benchmarks/bench_dedup.py [--policy-dir policies] [--k 7] [--threshold 0.7]
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from common import DEFAULT_CATALOG, DEFAULT_POLICY_DIR, catalog_queries, timed
+from policy_search import DEDUP_THRESHOLD, PolicySearch
+
+
+def redundant_hits(results, group_of) -> float:
+    counts = []
+    for hits in results:
+        seen = set()
+        n = 0
+        for h in hits:
+            g = group_of.get((h.file, h.orig_page), (h.file, h.orig_page))
+            n += g in seen
+            seen.add(g)
+        counts.append(n)
+    return statistics.mean(counts) if counts else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--policy-dir", default=DEFAULT_POLICY_DIR)
+    ap.add_argument("--catalog", default=DEFAULT_CATALOG)
+    ap.add_argument("--k", type=int, default=7)
+    ap.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    args = ap.parse_args()
+
+    queries = catalog_queries(args.catalog)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Seitentexte aus dem vorhandenen Index übernehmen (als BM25-Index mit anderer
+        # Konfiguration), damit beide Varianten ohne erneutes PDF-Lesen neu indexieren
+        source = os.path.join(tmp, "source.bin")
+        shutil.copy(PolicySearch(args.policy_dir).index_path, source)
+        PolicySearch(args.policy_dir, engine="bm25", index_path=source)
+        runs = {}
+        for label, dedup in (("ohne", False), ("dedup", True)):
+            path = os.path.join(tmp, f"{label}.bin")
+            shutil.copy(source, path)
+            t0 = time.perf_counter()
+            ps = PolicySearch(args.policy_dir, index_path=path, query_cache_size=0,
+                              dedup=dedup, dedup_threshold=args.threshold)
+            runs[label] = (ps, time.perf_counter() - t0, os.path.getsize(path))
+
+        dd = runs["dedup"][0]
+        # Vertreter-Seite je Seite als Gruppen-Schlüssel
+        group_of = {dd.meta[p]: dd.meta[int(r)] for p, r in enumerate(dd.dup_of) if r >= 0}
+        print(f"Near-Duplicate-Seiten: {len(group_of)} von {len(dd.meta)} (Schwelle {args.threshold})")
+        for label, (ps, build, size) in runs.items():
+            results = [ps.search(q, k=args.k) for q in queries]
+            ms = statistics.mean(timed(lambda q: ps.search(q, k=args.k), queries)) * 1000
+            print(f"{label:<6} Index {size / 1e6:6.1f} MB  Zeilen {len(ps.row_page):>6}  Aufbau {build:6.2f}s  "
+                  f"Query Ø {ms:6.2f} ms  redundant@{args.k} Ø {redundant_hits(results, group_of):.3f}")
+
+
+if __name__ == "__main__":
+    main()
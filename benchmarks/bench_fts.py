@@ -0,0 +1,157 @@
+# Benchmark: SQLite/FTS5-Backend gegen den In-Memory-TF-IDF-Index
+#
+# Misst Aufbau, Speicherbedarf (Datei und Peak-RSS), Query-Latenz, Übereinstimmung
+# der Top-k sowie das Entfernen/Hinzufügen eines einzelnen PDFs. Beide Backends lesen
+# dasselbe temporäre PDF-Verzeichnis; jede Messung läuft in einem eigenen Prozess, weil
+# ru_maxrss nur den Höchststand des ganzen Prozesses kennt.
+#
+# Aufruf:  python benchmarks/bench_fts.py [--policy-dir policies] [--k 7] [--candidates 200]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+from common import DEFAULT_CATALOG, DEFAULT_POLICY_DIR, catalog_queries, overlap_at_k, peak_rss_mb, percentiles
+from policy_fts import FTS_CANDIDATES
+
+BACKENDS = ("tfidf", "fts5")
+
+# Treffer-Schlüssel aus dem Kindprozess, mit den Feldern, die overlap_at_k vergleicht
+Hit = namedtuple("Hit", "file orig_page char_offset")
+
+
+def _open(args):
+    if args.backend == "fts5":
+        from policy_fts import FTSPolicySearch
+        return FTSPolicySearch(args.pdf_dir, workers=args.workers, candidates=args.candidates, query_cache_size=0)
+    from policy_search import PolicySearch
+    return PolicySearch(args.pdf_dir, workers=args.workers, query_cache_size=0)
+
+
+def _store_path(ps) -> str:
+    return ps.db_path if hasattr(ps, "db_path") else ps.index_path
+
+
+# Phase "build": Kaltaufbau aus den PDFs
+def phase_build(args) -> dict:
+    t0 = time.perf_counter()
+    ps = _open(args)
+    return {
+        "build_s": time.perf_counter() - t0,
+        "file_bytes": os.path.getsize(_store_path(ps)),
+        "peak_rss_build_mb": peak_rss_mb(),
+    }
+
+
+# Phase "query": vorhandenen Index/Datenbank öffnen, alle Katalog-Queries
+def phase_query(args) -> dict:
+    queries = catalog_queries(args.catalog)
+    t0 = time.perf_counter()
+    ps = _open(args)
+    load = time.perf_counter() - t0
+    rss_loaded = peak_rss_mb()
+    ps.search(queries[0], k=args.k)
+    times, hits = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        res = ps.search(q, k=args.k)
+        times.append(time.perf_counter() - t0)
+        hits.append([(h.file, h.orig_page, h.char_offset) for h in res])
+    return {
+        "load_s": load,
+        "query": percentiles(times),
+        "hits": hits,
+        "rss_after_load_mb": rss_loaded,
+        "peak_rss_query_mb": peak_rss_mb(),
+    }
+
+
+# Phase "update" (nur FTS5): größtes PDF entfernen und wieder hinzufügen
+def phase_update(args) -> dict:
+    ps = _open(args)
+    files = ps.list_files()
+    if not files:
+        return {}
+    fn = max(files, key=lambda f: os.path.getsize(os.path.join(args.pdf_dir, f)))
+    link = os.path.join(args.pdf_dir, fn)
+    target = os.readlink(link)
+    os.remove(link)
+    t0 = time.perf_counter()
+    ps.rebuild()
+    removed = time.perf_counter() - t0
+    os.symlink(target, link)
+    t0 = time.perf_counter()
+    ps.rebuild()
+    return {"file": fn, "remove_s": removed, "add_s": time.perf_counter() - t0}
+
+
+PHASES = {"build": phase_build, "query": phase_query, "update": phase_update}
+
+
+def _run_phase(args, phase: str, backend: str, pdf_dir: str) -> dict:
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--phase", phase, "--backend", backend,
+        "--pdf-dir", pdf_dir, "--catalog", args.catalog, "--k", str(args.k),
+        "--candidates", str(args.candidates), "--workers", str(args.workers),
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Phase {phase} ({backend}) fehlgeschlagen:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--policy-dir", default=DEFAULT_POLICY_DIR)
+    ap.add_argument("--catalog", default=DEFAULT_CATALOG)
+    ap.add_argument("--k", type=int, default=7)
+    ap.add_argument("--candidates", type=int, default=FTS_CANDIDATES)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    # intern: einzelne Phase im Kindprozess
+    ap.add_argument("--phase", choices=tuple(PHASES), default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--backend", choices=BACKENDS, default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--pdf-dir", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.phase:
+        print(json.dumps(PHASES[args.phase](args)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Eigenes Verzeichnis (Symlinks), damit Index, Datenbank und Einzel-PDF-Test das Original nicht berühren
+        pdf_dir = os.path.join(tmp, "policies")
+        os.makedirs(pdf_dir)
+        for fn in os.listdir(args.policy_dir):
+            if fn.lower().endswith(".pdf"):
+                os.symlink(os.path.abspath(os.path.join(args.policy_dir, fn)), os.path.join(pdf_dir, fn))
+
+        results = {}
+        for backend in BACKENDS:
+            print(f"[{backend}] Aufbau und Queries ...", flush=True)
+            res = _run_phase(args, "build", backend, pdf_dir)
+            res.update(_run_phase(args, "query", backend, pdf_dir))
+            results[backend] = res
+        update = _run_phase(args, "update", "fts5", pdf_dir)
+
+    ref = [[Hit(*h) for h in hits] for hits in results["tfidf"]["hits"]]
+    label = {"tfidf": "tfidf", "fts5": f"fts5+tfidf({args.candidates})"}
+    for backend, res in results.items():
+        q = res["query"]
+        print(f"{label[backend]:<18} n={q['n']:<4} mean={q['mean_ms']:8.2f} ms  p50={q['p50_ms']:8.2f} ms  "
+              f"p95={q['p95_ms']:8.2f} ms")
+    for backend, res in results.items():
+        alt = [[Hit(*h) for h in hits] for hits in res["hits"]]
+        print(f"{label[backend]:<18} Aufbau {res['build_s']:5.1f}s (inkl. PDF-Lesen), öffnen {res['load_s'] * 1000:6.1f} ms, "
+              f"Datei {res['file_bytes'] / 1e6:5.1f} MB, RSS geladen {res['rss_after_load_mb']:6.1f} MB, "
+              f"Peak Aufbau {res['peak_rss_build_mb']:6.1f} MB, Peak Queries {res['peak_rss_query_mb']:6.1f} MB, "
+              f"overlap@{args.k} {overlap_at_k(ref, alt, args.k):.3f}")
+    if update:
+        print(f"{update['file']}: entfernen {update['remove_s'] * 1000:.0f} ms, hinzufügen {update['add_s']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Benchmark: Empfehlungs-Pipeline mit Stand-in-LLM (ohne Netz, ohne API-Kosten)
+#
+# Erzeugt Empfehlungen für alle Schwachstellen des Katalogs mit dem Backend "fake" (oder
+# "local" gegen llm_server.py) und fester Modell-Latenz. Weil die Modellzeit bekannt ist,
+# bleibt als Differenz der eigene Overhead (Prompt-Aufbau, Parsing, Threads, HTTP-Client).
+# Der persistente Antwort-Cache ist abgeschaltet.
+#
+# Aufruf:  python benchmarks/bench_llm.py [--latency 0.5] [--concurrency 4] [--batch-size 5]
+#          python benchmarks/bench_llm.py --backend local --base-url http://127.0.0.1:8001/v1 --latency 0.5
+import argparse
+import math
+import os
+import statistics
+import time
+
+from common import DEFAULT_CATALOG, catalog_items
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--catalog", default=DEFAULT_CATALOG)
+    ap.add_argument("--backend", default="fake", choices=("fake", "local"))
+    ap.add_argument("--base-url", default="http://127.0.0.1:8001/v1")
+    ap.add_argument("--latency", type=float, default=0.5, help="Modell-Latenz pro Antwort (beim Server: dessen --latency)")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--batch-size", type=int, default=5)
+    ap.add_argument("--limit", type=int, default=20, help="Anzahl Schwachstellen")
+    args = ap.parse_args()
+
+    # Backend vor dem ersten Import von llm festlegen
+    os.environ["LLM_BACKEND"] = args.backend
+    os.environ["LLM_BASE_URL"] = args.base_url
+    os.environ["LLM_FAKE_LATENCY"] = str(args.latency)
+    os.environ["LLM_CACHE_PATH"] = ""
+    from policy_search import PolicyHit
+    from recommender import ActionStream, llm_actions_many
+
+    # Feste Auszüge statt Policy-Suche: gemessen wird nur die LLM-Strecke
+    snippet = ("Die Organisation muss Zuständigkeiten, Verfahren und Kontrollen festlegen, dokumentieren "
+               "und regelmäßig überprüfen. ") * 6
+    hits = [PolicyHit(file=f"policy{i}.pdf", page=i + 1, score=0.5, snippet=snippet, orig_page=i + 1)
+            for i in range(3)]
+    # Eine Kombination je Schwachstelle, wie im Empfehlungs-Tab
+    items, seen = [], set()
+    for t, v, a in catalog_items(args.catalog):
+        if v not in seen:
+            seen.add(v)
+            items.append((t, v, a))
+    items = items[:args.limit]
+    requests = [(hits, {"threat": t, "vuln": v, "asset": a, "risk": 3.0}) for t, v, a in items]
+    n, lat, c, b = len(requests), args.latency, args.concurrency, args.batch_size
+
+    # (Bezeichnung, Parameter, erwartete reine Modellzeit)
+    modes = [
+        ("einzeln, seriell", dict(max_workers=1, batch_size=1), n * lat),
+        (f"einzeln, {c} parallel", dict(max_workers=c, batch_size=1), math.ceil(n / c) * lat),
+        (f"Sammel {b}, {c} parallel", dict(max_workers=c, batch_size=b), math.ceil(math.ceil(n / b) / c) * lat),
+    ]
+    # Erster Aufruf lädt Client/Module, nicht mitmessen
+    llm_actions_many(requests[:1], max_workers=1, batch_size=1)
+
+    print(f"Backend {args.backend}, {n} Schwachstellen, Modell-Latenz {lat:.2f}s")
+    for label, kwargs, model_time in modes:
+        t0 = time.perf_counter()
+        results = llm_actions_many(requests, **kwargs)
+        wall = time.perf_counter() - t0
+        failed = sum(r is None for r in results)
+        print(f"  {label:<22} {wall:7.2f}s  Modell {model_time:6.2f}s  Overhead {wall - model_time:+6.3f}s"
+              f"  ({(wall - model_time) / n * 1000:+.1f} ms/Empfehlung, {failed} Fehler)")
+
+    # Streaming: Zeit bis zum ersten sichtbaren Text gegenüber der Gesamtdauer
+    first, total = [], []
+    for req in requests[:min(5, n)]:
+        stream = ActionStream(*req)
+        t0 = time.perf_counter()
+        ttfc = None
+        for _ in stream:
+            if ttfc is None:
+                ttfc = time.perf_counter() - t0
+        first.append(ttfc or 0.0)
+        total.append(time.perf_counter() - t0)
+    print(f"  Streaming              erster Text Ø {statistics.mean(first):.3f}s, komplett Ø {statistics.mean(total):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
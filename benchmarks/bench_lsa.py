@@ -0,0 +1,141 @@
+# Benchmark: LSA-Modus (mit/ohne Re-Ranking) gegen die exakte TF-IDF-Suche
+#
+# Jede Variante wird in einem eigenen Prozess gebaut und in einem weiteren geladen und
+# abgefragt, damit Artefaktgröße, RSS und Latenz je Variante nebeneinander stehen (ru_maxrss
+# überlebt fork/exec, der Elternprozess baut deshalb selbst nichts).
+#
+# Aufruf:  python benchmarks/bench_lsa.py [--policy-dir policies] [--k 7] [--components 256]
+#                                         [--max-features 20000]
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import DEFAULT_CATALOG, DEFAULT_POLICY_DIR, peak_rss_mb, percentiles, policy_queries
+
+# (Bezeichnung, PolicySearch-Optionen)
+VARIANTS = [
+    ("tfidf", dict(engine="tfidf")),
+    ("lsa", dict(engine="lsa", rerank=False)),
+    ("lsa+rerank", dict(engine="lsa", rerank=True)),
+]
+
+
+def _keys(hits):
+    return {tuple(h) for h in hits}
+
+
+def recall_at_k(reference, candidate, k: int) -> float:
+    vals = []
+    for ref, cand in zip(reference, candidate):
+        ref_keys = _keys(ref[:k])
+        if ref_keys:
+            vals.append(len(ref_keys & _keys(cand[:k])) / len(ref_keys))
+    return sum(vals) / len(vals) if vals else 0.0
+
+
+def _options(args, variant: str) -> dict:
+    opts = dict(dict(VARIANTS)[variant])
+    if opts["engine"] == "lsa":
+        opts.update(lsa_components=args.components, lsa_max_features=args.max_features)
+    return opts
+
+
+# Phase "build": TF-IDF-Index unter policy_dir laden/bauen; LSA aus einer Kopie davon
+# (die Seitentexte werden übernommen, nur neu indexiert)
+def phase_build(args) -> dict:
+    from policy_search import PolicySearch
+
+    opts = _options(args, args.variant)
+    if opts["engine"] == "tfidf":
+        ps = PolicySearch(args.policy_dir, query_cache_size=0)
+        return {"index_path": ps.index_path, "features": int(ps.X.shape[1])}
+    shutil.copy(args.base, args.index_path)
+    t0 = time.perf_counter()
+    PolicySearch(args.policy_dir, index_path=args.index_path, query_cache_size=0, **opts)
+    return {"index_path": args.index_path, "build_s": time.perf_counter() - t0}
+
+
+# Phase "query": Index laden, alle Queries
+def phase_query(args) -> dict:
+    from policy_search import PolicySearch
+
+    queries = policy_queries(args.catalog)
+    ps = PolicySearch(args.policy_dir, index_path=args.index_path, query_cache_size=0,
+                      read_only=True, **_options(args, args.variant))
+    rss_loaded = peak_rss_mb()
+    ps.search(queries[0], k=args.k)
+    times, hits = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        res = ps.search(q, k=args.k)
+        times.append(time.perf_counter() - t0)
+        hits.append([(h.file, h.orig_page, h.char_offset) for h in res])
+    return {
+        "query": percentiles(times),
+        "hits": hits,
+        "rss_after_load_mb": rss_loaded,
+        "peak_rss_mb": peak_rss_mb(),
+        "memory": ps.memory_report(),
+        "dims": int(ps.lsa_docs.shape[1]) if ps.lsa_docs is not None else None,
+    }
+
+
+def _run_phase(args, phase: str, variant: str, index_path: str, base: str = "") -> dict:
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--phase", phase, "--variant", variant,
+        "--policy-dir", args.policy_dir, "--index-path", index_path, "--base", base,
+        "--catalog", args.catalog, "--k", str(args.k), "--components", str(args.components),
+        "--max-features", str(args.max_features),
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Variante {variant} fehlgeschlagen:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--policy-dir", default=DEFAULT_POLICY_DIR)
+    ap.add_argument("--catalog", default=DEFAULT_CATALOG)
+    ap.add_argument("--k", type=int, default=7)
+    ap.add_argument("--components", type=int, default=256)
+    ap.add_argument("--max-features", type=int, default=20000)
+    # intern: einzelne Phase einer Variante im Kindprozess
+    ap.add_argument("--phase", choices=("build", "query"), default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--variant", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--index-path", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--base", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.phase:
+        print(json.dumps(phase_build(args) if args.phase == "build" else phase_query(args)))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        base = ""
+        for variant, _ in VARIANTS:
+            res = _run_phase(args, "build", variant, os.path.join(tmp, f"{variant}.bin"), base)
+            base = base or res["index_path"]
+            res.update(_run_phase(args, "query", variant, res["index_path"]))
+            res["index_bytes"] = os.path.getsize(res["index_path"])
+            results[variant] = res
+
+    ref = results["tfidf"]["hits"]
+    print(f"{'':<12} {'Artefakt':>10} {'RSS geladen':>12} {'RSS Peak':>10} {'p50':>9} {'p95':>9}  recall@{args.k}")
+    for variant, res in results.items():
+        print(f"{variant:<12} {res['index_bytes'] / 2**20:8.1f} MB {res['rss_after_load_mb']:9.1f} MB "
+              f"{res['peak_rss_mb']:7.1f} MB {res['query']['p50_ms']:6.2f} ms {res['query']['p95_ms']:6.2f} ms"
+              f"  {recall_at_k(ref, res['hits'], args.k):.3f}")
+    features = results["tfidf"]["features"]
+    print(f"Index-Features: {features}  LSA-Features: {min(args.max_features, features)}  "
+          f"LSA-Dimensionen: {results['lsa']['dims']}")
+
+
+if __name__ == "__main__":
+    main()
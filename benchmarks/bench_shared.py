@@ -0,0 +1,81 @@
+# Benchmark: Speicher pro Server-Prozess, wenn alle denselben Index per mmap anhängen
+#
+# Ein Lader baut/veröffentlicht den Index, danach hängen sich N Prozesse read-only an
+# und führen alle Katalog-Queries aus. Gemeldet werden je Prozess RSS, PSS (geteilte
+# Seiten anteilig) und privater Speicher aus /proc/self/smaps_rollup (nur Linux).
+#
+# Aufruf:  python benchmarks/bench_shared.py [--policy-dir policies] [--procs 1,2,4] [--engine tfidf]
+import argparse
+import multiprocessing as mp
+import statistics
+
+from common import DEFAULT_CATALOG, DEFAULT_POLICY_DIR, catalog_queries
+from policy_search import PolicySearch
+
+
+def _smaps_mb() -> dict:
+    out = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean"):
+                    out[key] = int(rest.split()[0]) / 1024
+    except OSError:
+        pass
+    return out
+
+
+def _worker(args, queries, barrier, results):
+    ps = PolicySearch(args.policy_dir, index_path=args.index_path, read_only=True)
+    for q in queries:
+        ps.search(q, k=args.k)
+    # Alle Prozesse leben gleichzeitig, erst dann ist PSS aussagekräftig
+    barrier.wait()
+    results.put({"smaps": _smaps_mb(), "index": ps.memory_report()})
+
+
+def measure(args, queries, n: int):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(n)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(args, queries, barrier, results)) for _ in range(n)]
+    for p in procs:
+        p.start()
+    out = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--policy-dir", default=DEFAULT_POLICY_DIR)
+    ap.add_argument("--catalog", default=DEFAULT_CATALOG)
+    ap.add_argument("--engine", default="tfidf")
+    ap.add_argument("--procs", default="1,2,4")
+    ap.add_argument("--k", type=int, default=7)
+    args = ap.parse_args()
+
+    queries = catalog_queries(args.catalog)
+    # Lader: baut bei Bedarf und veröffentlicht den Index
+    loader = PolicySearch(args.policy_dir, engine=args.engine)
+    args.index_path = loader.index_path
+    rep = loader.memory_report()
+    print(f"Index: {rep['shared'] / 1e6:.1f} MB geteilt, {rep['private'] / 1e6:.1f} MB privat")
+    del loader
+
+    for n in [int(x) for x in args.procs.split(",") if x.strip()]:
+        res = measure(args, queries, n)
+        smaps = [r["smaps"] for r in res]
+        if not smaps[0]:
+            print(f"{n} Prozesse: /proc/self/smaps_rollup nicht verfügbar")
+            continue
+        mean = lambda key: statistics.mean(s[key] for s in smaps)
+        print(f"{n} Prozesse: RSS Ø {mean('Rss'):7.1f} MB  PSS Ø {mean('Pss'):7.1f} MB  "
+              f"privat Ø {mean('Private_Dirty') + mean('Private_Clean'):7.1f} MB  "
+              f"geteilt Ø {mean('Shared_Clean'):7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
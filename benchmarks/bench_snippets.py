@@ -0,0 +1,89 @@
+# Benchmark: Snippet-Auflösung – PDF-Parsing pro Treffer, Seitenanfang aus dem
+# Seitenspeicher und Schlagwort-Fenster über die vorberechneten Term-Positionen
+#
+# Aufruf:  python benchmarks/bench_snippets.py [--policy-dir policies] [--k 7]
+import argparse
+import os
+import statistics
+
+from PyPDF2 import PdfReader
+
+from common import DEFAULT_CATALOG, DEFAULT_POLICY_DIR, catalog_queries, report, timed
+from policy_search import SNIPPET_MAX_CHARS, PolicySearch, _keywords_from_query, _normalize_text
+
+
+# Alter Pfad: PdfReader pro Kandidatenseite
+def _legacy_page_text(policy_dir: str, file: str, page: int) -> str:
+    try:
+        reader = PdfReader(os.path.join(policy_dir, file))
+        idx = max(0, min(len(reader.pages) - 1, page - 1))
+        return _normalize_text(reader.pages[idx].extract_text() or "")
+    except Exception:
+        return ""
+
+
+# Früheres Verhalten: erste Kandidatenseite mit irgendeinem Schlagwort, Seitenanfang als Auszug
+def _head_snippet(page_text):
+    def pick(file, page, query):
+        kws = _keywords_from_query(query)
+        candidates = [page] + ([page - 1] if page > 1 else []) + [page + 1]
+        for p in candidates:
+            txt = page_text(file, p)
+            if txt and (not kws or any(k in txt.lower() for k in kws)):
+                return p, txt[:SNIPPET_MAX_CHARS]
+        txt = page_text(file, page)
+        return page, txt[:SNIPPET_MAX_CHARS] if txt else ""
+    return pick
+
+
+def _snippet_stats(label: str, results, queries):
+    lengths, found = [], []
+    for hits, q in zip(results, queries):
+        kws = _keywords_from_query(q)
+        for h in hits:
+            lengths.append(len(h.snippet))
+            low = h.snippet.lower()
+            found.append(sum(k in low for k in kws))
+    print(f"{label:<14} Auszug Ø {statistics.mean(lengths):6.0f} Zeichen  "
+          f"Schlagworte im Auszug Ø {statistics.mean(found):.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--policy-dir", default=DEFAULT_POLICY_DIR)
+    ap.add_argument("--catalog", default=DEFAULT_CATALOG)
+    ap.add_argument("--k", type=int, default=7)
+    ap.add_argument("--limit", type=int, default=10, help="Anzahl Queries für den alten Pfad")
+    args = ap.parse_args()
+
+    queries = catalog_queries(args.catalog)[:args.limit]
+
+    # Je Instanz eine Aufwärm-Suche vor der Messung: die erste Suche lädt sklearn
+    # und baut den Query-Vectorizer, das soll keinem Pfad angerechnet werden
+    ps = PolicySearch(args.policy_dir, query_cache_size=0)
+    ps.search(queries[0], k=args.k)
+    window_times = timed(lambda q: ps.search(q, k=args.k), queries)
+    window = [ps.search(q, k=args.k) for q in queries]
+
+    head = PolicySearch(args.policy_dir, query_cache_size=0)
+    head._best_matching_page_with_snippet = _head_snippet(head.pages.get)
+    head.search(queries[0], k=args.k)
+    head_times = timed(lambda q: head.search(q, k=args.k), queries)
+    head_hits = [head.search(q, k=args.k) for q in queries]
+
+    legacy = PolicySearch(args.policy_dir, query_cache_size=0)
+    legacy._best_matching_page_with_snippet = _head_snippet(
+        lambda file, page: _legacy_page_text(args.policy_dir, file, page))
+    legacy.search(queries[0], k=args.k)
+    legacy_times = timed(lambda q: legacy.search(q, k=args.k), queries)
+
+    report("pdf-parsing", legacy_times)
+    report("page-store", head_times)
+    report("kw-window", window_times)
+    print(f"Speedup (mean): {statistics.mean(legacy_times) / statistics.mean(window_times):.1f}x")
+    _snippet_stats("page-store", head_hits, queries)
+    _snippet_stats("kw-window", window, queries)
+
+
+if __name__ == "__main__":
+    main()
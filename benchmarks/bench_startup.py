@@ -0,0 +1,87 @@
+# Benchmark: Import-Kosten beim Start der App, aufgeschlüsselt nach Modul
+#
+# Importiert die Module von app.py in einem frischen Prozess mit `python -X importtime`
+# und summiert die kumulierte Zeit je direkt importiertem Paket. Zusätzlich werden die
+# verzögert geladenen Pakete einzeln gemessen (erste Suche, erster Export, erste Empfehlung).
+#
+# Aufruf:  python benchmarks/bench_startup.py [--repeat 5] [--top 15]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from common import ROOT
+
+# Imports von app.py (ohne die Streamlit-Ausführung des Skripts selbst)
+APP_IMPORTS = [
+    "streamlit", "numpy", "pandas", "matplotlib", "intake_flow", "risk_engine", "pdf_export",
+    "recommender", "policy_fts", "policy_search", "index_manager", "theme",
+]
+
+# Erst bei Bedarf geladen: (Paket, Auslöser)
+DEFERRED = [
+    ("sklearn.feature_extraction.text", "erste Suche"),
+    ("PyPDF2", "erster Index-Aufbau"),
+    ("reportlab.platypus", "erster PDF-Export"),
+    ("openai", "erste Empfehlung"),
+]
+
+
+def _importtime(modules, loaded=None) -> dict:
+    code = "import " + ", ".join(modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    # Zeilen: "import time: <self us> | <kumuliert us> | <Einrückung><Modul>"
+    top = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if loaded is not None:
+            loaded.add(name.strip())
+        if depth == 0:
+            top[name.strip()] = int(cumulative) / 1000
+    return top
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+
+    # Median über mehrere kalte Prozesse; erster Lauf wärmt nur den Datei-Cache an
+    loaded = set()
+    _importtime(APP_IMPORTS, loaded)
+    runs = [_importtime(APP_IMPORTS) for _ in range(args.repeat)]
+    per_module = defaultdict(list)
+    for run in runs:
+        for name, ms in run.items():
+            per_module[name].append(ms)
+    medians = {name: statistics.median(v) for name, v in per_module.items()}
+    total = statistics.median(sum(run.values()) for run in runs)
+
+    print(f"App-Imports gesamt: {total:.0f} ms (Median aus {args.repeat} Prozessen)")
+    for name, ms in sorted(medians.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:<36} {ms:8.1f} ms  {ms / total:6.1%}")
+    eager = [pkg for pkg, _ in DEFERRED if pkg in loaded]
+    if eager:
+        print(f"⚠️ Beim Start geladen, obwohl verzögert vorgesehen: {', '.join(eager)}")
+
+    print("Verzögert geladen (einzeln, kalter Prozess):")
+    for pkg, trigger in DEFERRED:
+        try:
+            ms = statistics.median(sum(_importtime([pkg]).values()) for _ in range(max(1, args.repeat // 2)))
+        except RuntimeError as e:
+            print(f"  {pkg:<36} nicht verfügbar ({e})")
+            continue
+        print(f"  {pkg:<36} {ms:8.1f} ms  ({trigger})")
+
+
+if __name__ == "__main__":
+    main()
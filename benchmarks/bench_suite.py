@@ -0,0 +1,191 @@
+# Benchmark-Suite für PolicySearch: Aufbau, Laden, Query-Latenz, Snippets, Speicher
+#
+# Läuft auf den mitgelieferten PDFs und auf synthetisch vervielfachten Korpora
+# (jede PDF n-mal verlinkt). Jede Messung läuft in einem eigenen Prozess, damit
+# Peak-RSS und Kaltstart nicht von vorherigen Läufen verfälscht werden.
+# Die Kopien sind identisch; ohne --dedup wird deshalb ohne Near-Duplicate-Erkennung
+# indexiert, sonst schrumpft jeder Korpus wieder auf den 1x-Index.
+#
+# Aufruf:  python benchmarks/bench_suite.py [--scales 1,10,100] [--engines tfidf,bm25]
+#                                           [--dedup] [--out bench_results.json]
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import DEFAULT_CATALOG, DEFAULT_POLICY_DIR, peak_rss_mb, percentiles, policy_queries, resource
+
+
+# Korpus mit n Kopien jeder PDF (Symlinks, falls möglich)
+def replicate_corpus(policy_dir: str, scale: int, target: str) -> str:
+    os.makedirs(target, exist_ok=True)
+    pdfs = sorted(fn for fn in os.listdir(policy_dir) if fn.lower().endswith(".pdf"))
+    for i in range(scale):
+        for fn in pdfs:
+            src = os.path.abspath(os.path.join(policy_dir, fn))
+            dst = os.path.join(target, f"r{i:03d}_{fn}")
+            try:
+                os.symlink(src, dst)
+            except (OSError, NotImplementedError):
+                shutil.copy(src, dst)
+    return target
+
+
+def _open(args, **kwargs):
+    from policy_search import PolicySearch
+    return PolicySearch(args.policy_dir, workers=args.workers, engine=args.engine,
+                        chunk_chars=args.chunk_chars, index_path=args.index_path,
+                        query_cache_size=0, dedup=args.dedup, **kwargs)
+
+
+# Phase "build": Kaltaufbau ohne vorhandenen Index
+def phase_build(args) -> dict:
+    if os.path.exists(args.index_path):
+        os.remove(args.index_path)
+    t0 = time.perf_counter()
+    ps = _open(args)
+    build = time.perf_counter() - t0
+    return {
+        "pages": len(ps.meta),
+        "rows": int(len(ps.row_page)),
+        "files": len(ps.fingerprints),
+        "cold_build_s": build,
+        "index_bytes": os.path.getsize(args.index_path) if os.path.exists(args.index_path) else 0,
+        "peak_rss_build_mb": peak_rss_mb(),
+        "peak_rss_extract_workers_mb": peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+
+
+# Phase "query": Laden des vorhandenen Index, dann alle Katalog-Queries
+def phase_query(args) -> dict:
+    from policy_search import _normalize_query
+
+    queries = policy_queries(args.catalog)
+    t0 = time.perf_counter()
+    ps = _open(args)
+    load = time.perf_counter() - t0
+    rss_loaded = peak_rss_mb()
+
+    # Erste Query separat: enthält den verzögerten Aufbau des Query-Vectorizers
+    t0 = time.perf_counter()
+    ps.search(queries[0], k=args.k)
+    first = time.perf_counter() - t0
+
+    total, scoring, snippets = [], [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        Q = ps._query_vectors([_normalize_query(q)], ps.index_version)
+        sims = next(ps._iter_scores(Q, args.k))
+        rows = ps._select_rows(sims, args.k)
+        t1 = time.perf_counter()
+        ps._hits_for(rows, sims[rows], q)
+        t2 = time.perf_counter()
+        scoring.append(t1 - t0)
+        snippets.append(t2 - t1)
+        total.append(t2 - t0)
+
+    t0 = time.perf_counter()
+    ps.search_many(queries, k=args.k)
+    batch = time.perf_counter() - t0
+
+    return {
+        "queries": len(queries),
+        "warm_load_s": load,
+        "first_query_s": first,
+        "query": percentiles(total),
+        "scoring": percentiles(scoring),
+        "snippets": percentiles(snippets),
+        "search_many_s": batch,
+        "rss_after_load_mb": rss_loaded,
+        "peak_rss_query_mb": peak_rss_mb(),
+    }
+
+
+def _run_phase(phase: str, policy_dir: str, index_path: str, engine: str, args) -> dict:
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--phase", phase,
+        "--policy-dir", policy_dir, "--index-path", index_path, "--engines", engine,
+        "--catalog", args.catalog, "--k", str(args.k), "--workers", str(args.workers),
+    ]
+    if args.chunk_chars:
+        cmd += ["--chunk-chars", str(args.chunk_chars)]
+    if args.dedup:
+        cmd.append("--dedup")
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Phase {phase} ({engine}) fehlgeschlagen:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--policy-dir", default=DEFAULT_POLICY_DIR)
+    ap.add_argument("--catalog", default=DEFAULT_CATALOG)
+    ap.add_argument("--scales", default="1,10,100", help="Vervielfachung des Korpus, kommagetrennt")
+    ap.add_argument("--engines", default="tfidf,bm25", help="Engines, kommagetrennt")
+    ap.add_argument("--k", type=int, default=7)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk-chars", type=int, default=None)
+    ap.add_argument("--dedup", action="store_true", help="Near-Duplicates zusammenfassen (Kopien fallen weg)")
+    ap.add_argument("--work-dir", default=None, help="Ablage für Korpora und Indizes (Standard: temporär)")
+    ap.add_argument("--out", default="bench_results.json")
+    # intern: einzelne Phase im Kindprozess
+    ap.add_argument("--phase", choices=("build", "query"), default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--index-path", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.phase:
+        args.engine = args.engines
+        result = phase_build(args) if args.phase == "build" else phase_query(args)
+        print(json.dumps(result))
+        return
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    work = args.work_dir or tempfile.mkdtemp(prefix="policy-bench-")
+    os.makedirs(work, exist_ok=True)
+
+    results = []
+    try:
+        for scale in scales:
+            corpus = replicate_corpus(args.policy_dir, scale, os.path.join(work, f"x{scale}"))
+            for engine in engines:
+                index_path = os.path.join(work, f"x{scale}_{engine}.bin")
+                print(f"[x{scale} {engine}] Kaltaufbau ...", flush=True)
+                entry = {"scale": scale, "engine": engine, "chunk_chars": args.chunk_chars, "dedup": args.dedup}
+                entry.update(_run_phase("build", corpus, index_path, engine, args))
+                print(f"[x{scale} {engine}] Queries ...", flush=True)
+                entry.update(_run_phase("query", corpus, index_path, engine, args))
+                results.append(entry)
+                print(f"[x{scale} {engine}] pages={entry['pages']} rows={entry['rows']} "
+                      f"build={entry['cold_build_s']:.1f}s "
+                      f"load={entry['warm_load_s'] * 1000:.1f}ms "
+                      f"p50={entry['query']['p50_ms']:.2f}ms p99={entry['query']['p99_ms']:.2f}ms "
+                      f"rss={entry['peak_rss_query_mb']}MB", flush=True)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work, ignore_errors=True)
+
+    out = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "policy_dir": os.path.abspath(args.policy_dir),
+        "k": args.k,
+        "workers": args.workers,
+        "dedup": args.dedup,
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2, ensure_ascii=False)
+    print(f"Ergebnisse: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Gemeinsame Helfer für die Benchmarks
+import os
+import statistics
+import sys
+import time
+
+import yaml
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DEFAULT_POLICY_DIR = os.path.join(ROOT, "policies")
+DEFAULT_CATALOG = os.path.join(ROOT, "data", "risk_catalog.yaml")
+
+
+def catalog_queries(path: str = DEFAULT_CATALOG):
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = yaml.safe_load(f)
+    return [v["name"] for v in catalog.get("vulnerabilities", [])]
+
+
+# Alle (Bedrohung, Schwachstelle, Asset)-Kombinationen aus dem Katalog, wie sie die App abfragt
+def catalog_items(path: str = DEFAULT_CATALOG):
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = yaml.safe_load(f)
+    assets = {a["id"]: a["name"] for a in catalog.get("assets", [])}
+    threats = {t["id"]: t["name"] for t in catalog.get("threats", [])}
+    items = []
+    for v in catalog.get("vulnerabilities", []):
+        for tid in v.get("threats", []):
+            for aid in v.get("assets", []):
+                if tid in threats and aid in assets:
+                    items.append((threats[tid], v["name"], assets[aid]))
+    return items
+
+
+# Suchanfragen über build_query_for_policy (die Benchmarks rufen kein LLM auf)
+def policy_queries(path: str = DEFAULT_CATALOG):
+    from recommender import build_query_for_policy
+    return [build_query_for_policy(t, v, a) for t, v, a in catalog_items(path)]
+
+
+# Peak-RSS des Prozesses (oder RUSAGE_CHILDREN) in MB; None ohne resource-Modul
+def peak_rss_mb(who=None):
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # Linux meldet KiB, macOS Bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _hit_keys(hits):
+    return {(h.file, h.orig_page, h.char_offset) for h in hits}
+
+
+# Anteil gemeinsamer Treffer in den Top-k (symmetrisch, 1.0 = gleiche Seiten)
+def overlap_at_k(a, b, k: int) -> float:
+    vals = []
+    for ha, hb in zip(a, b):
+        ka, kb = _hit_keys(ha[:k]), _hit_keys(hb[:k])
+        if ka or kb:
+            vals.append(len(ka & kb) / max(len(ka), len(kb)))
+    return sum(vals) / len(vals) if vals else 0.0
+
+
+def timed(fn, items):
+    times = []
+    for it in items:
+        t0 = time.perf_counter()
+        fn(it)
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(len(sorted_vals) * q))]
+
+
+def percentiles(times) -> dict:
+    ms = sorted(t * 1000 for t in times)
+    return {
+        "n": len(ms),
+        "mean_ms": statistics.mean(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 0.50),
+        "p95_ms": percentile(ms, 0.95),
+        "p99_ms": percentile(ms, 0.99),
+    }
+
+
+def report(label: str, times):
+    ms = sorted(t * 1000 for t in times)
+    print(f"{label:<14} n={len(ms):<4} mean={statistics.mean(ms):8.2f} ms  "
+          f"p50={statistics.median(ms):8.2f} ms  p95={percentile(ms, 0.95):8.2f} ms")
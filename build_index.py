@@ -0,0 +1,77 @@
+# Policy-Index offline bauen (CI/Container-Build), damit die App keine PDFs parsen muss
+#
+# Aufruf:  python build_index.py [--policy-dir policies] [--out policies/policy_index.bin]
+#                                [--workers 4] [--engine tfidf] [--chunk-chars 600] [--clean]
+#
+# Das Artefakt ist eine einzelne Datei (Format-Version + SHA-256 im Header). Die App lädt
+# es mit POLICY_INDEX_PATH=<Datei> nur lesend und prüft dabei die Prüfsumme.
+import argparse
+import os
+import sys
+import time
+
+from policy_index import read_header, read_index
+from policy_search import (CHUNK_OVERLAP, DEDUP_THRESHOLD, ENGINES, INDEX_FILE, LSA_COMPONENTS,
+                           LSA_MAX_FEATURES, PolicySearch)
+
+
+def _progress(done: int, total: int, label: str):
+    print(f"  [{done}/{total}] {label}", flush=True)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Policy-Index als Build-Artefakt erzeugen")
+    ap.add_argument("--policy-dir", default="policies")
+    ap.add_argument("--out", default=None, help=f"Zieldatei (Standard: <policy-dir>/{INDEX_FILE})")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--engine", choices=ENGINES, default="tfidf")
+    ap.add_argument("--chunk-chars", type=int, default=None)
+    ap.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP)
+    ap.add_argument("--lsa-components", type=int, default=LSA_COMPONENTS)
+    ap.add_argument("--lsa-max-features", type=int, default=LSA_MAX_FEATURES)
+    ap.add_argument("--no-rerank", action="store_true",
+                    help="LSA ohne exaktes Re-Ranking (TF-IDF-Matrix wird nicht gespeichert)")
+    ap.add_argument("--dedup", action="store_true", help="Near-Duplicate-Seiten zusammenfassen (MinHash/LSH)")
+    ap.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD)
+    ap.add_argument("--clean", action="store_true", help="Vorhandenes Artefakt ignorieren und komplett neu bauen")
+    args = ap.parse_args()
+
+    out = args.out or os.path.join(args.policy_dir, INDEX_FILE)
+    if not os.path.isdir(args.policy_dir):
+        print(f"❌ Policy-Verzeichnis {args.policy_dir} nicht gefunden.", file=sys.stderr)
+        return 1
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    if args.clean and os.path.exists(out):
+        os.remove(out)
+
+    t0 = time.perf_counter()
+    # Vorhandenes Artefakt wird inkrementell aktualisiert (unveränderte PDFs nicht neu gelesen)
+    ps = PolicySearch(args.policy_dir, workers=args.workers, engine=args.engine,
+                      chunk_chars=args.chunk_chars, chunk_overlap=args.chunk_overlap,
+                      lsa_components=args.lsa_components, lsa_max_features=args.lsa_max_features,
+                      rerank=not args.no_rerank, index_path=out,
+                      dedup=args.dedup, dedup_threshold=args.dedup_threshold,
+                      progress=_progress)
+    if ps.is_stale():
+        ps.rebuild()
+    elapsed = time.perf_counter() - t0
+
+    if not ps.meta or not os.path.exists(out):
+        print(f"❌ Keine PDFs mit Text in {args.policy_dir} gefunden, kein Artefakt geschrieben.", file=sys.stderr)
+        return 1
+
+    # Geschriebenes Artefakt so prüfen, wie es die App später lädt
+    read_index(out, verify=True)
+    header = read_header(out)
+    meta = header["meta"]
+    print(f"✅ {out}")
+    print(f"   Format-Version {header['format_version']}, erstellt {meta.get('created', '?')}")
+    print(f"   SHA-256 {header['sha256']}")
+    print(f"   Engine {meta['engine']}, {len(meta['files'])} PDFs, {len(ps.meta)} Seiten, "
+          f"{len(ps.row_page)} Index-Zeilen, {os.path.getsize(out) / 1e6:.1f} MB, {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# Hintergrund-Neuindexierung mit atomarem Austausch des Policy-Index
+#
+# Der Manager hält die aktuelle Index-Generation für alle Sessions. Ein Neuaufbau läuft
+# in einem Worker-Thread und schreibt die neue Generation daneben; erst wenn sie fertig
+# ist, wird sie mit einer einzigen Zuweisung aktiv. Suchen auf der alten Generation
+# laufen ungestört weiter.
+import threading
+import time
+from typing import Dict, Optional
+
+
+class IndexManager:
+    def __init__(self, search):
+        self._current = search
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Zählt erfolgreiche Austausche; Sessions erkennen daran eine neue Generation
+        self.generation = 0
+        self._status: Dict[str, object] = {
+            "running": False, "done": 0, "total": 0, "label": "",
+            "error": None, "finished_at": None,
+        }
+
+    @property
+    def current(self):
+        return self._current
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            return dict(self._status)
+
+    # Startet den Neuaufbau; False, wenn bereits einer läuft
+    def start_rebuild(self) -> bool:
+        with self._lock:
+            if self._status["running"]:
+                return False
+            self._status.update(running=True, done=0, total=0, label="Starte...", error=None)
+            self._thread = threading.Thread(target=self._run, name="policy-reindex", daemon=True)
+            self._thread.start()
+            return True
+
+    def wait(self, timeout: Optional[float] = None):
+        t = self._thread
+        if t is not None:
+            t.join(timeout)
+
+    def _progress(self, done: int, total: int, label: str):
+        with self._lock:
+            self._status.update(done=done, total=total, label=label)
+
+    def _run(self):
+        try:
+            nxt = self._current.next_generation(progress=self._progress)
+            with self._lock:
+                self._current = nxt
+                self.generation += 1
+                self._status.update(running=False, label="Fertig", finished_at=time.time())
+        except Exception as e:
+            with self._lock:
+                self._status.update(running=False, error=str(e), finished_at=time.time())
@@ -1,24 +1,90 @@
-# OpenAI API Anbindung
+# KI-Anbindung mit austauschbarem Backend (LLM_BACKEND)
+#   openai – OpenAI-API (Standard, braucht OPENAI_API_KEY)
+#   local  – OpenAI-kompatibler Server unter LLM_BASE_URL, z. B. der Stand-in llm_server.py
+#   fake   – im Prozess, deterministische Antworten mit LLM_FAKE_LATENCY Sekunden Latenz
 import os
+import threading
+from types import SimpleNamespace
+
 from dotenv import load_dotenv
-from openai import OpenAI
 
-load_dotenv(override=True)
+# .env nur als Vorgabe: explizit gesetzte Umgebungsvariablen (z. B. aus Benchmarks) haben Vorrang
+load_dotenv(override=False)
+
+BACKENDS = ("openai", "local", "fake")
+BACKEND = os.getenv("LLM_BACKEND", "openai").strip().lower() or "openai"
+
+# Modellname fließt in den Antwort-Cache ein: Stand-in-Antworten landen nie unter dem echten Modell
+DEFAULT_MODELS = {"openai": "gpt-4o-mini", "local": "local-stub", "fake": "fake"}
+MODEL = os.getenv("LLM_MODEL", "").strip() or DEFAULT_MODELS.get(BACKEND, "gpt-4o-mini")
 
+LOCAL_BASE_URL = os.getenv("LLM_BASE_URL", "http://127.0.0.1:8001/v1").strip()
 
 api_key = os.getenv("OPENAI_API_KEY", "").strip()
-if not (api_key.startswith("sk-") and len(api_key) > 40):
-    raise RuntimeError("OPENAI_API_KEY fehlt oder ist ungültig. Bitte in .env prüfen.")
+
+# Client (und das openai-Paket) erst bei der ersten Anfrage laden
+_client = None
+_fake = None
+_lock = threading.Lock()
+
+
+def _get_client():
+    global _client
+    with _lock:
+        if _client is None:
+            if BACKEND not in BACKENDS or BACKEND == "fake":
+                raise RuntimeError(f"Unbekanntes LLM_BACKEND '{BACKEND}' (erlaubt: {', '.join(BACKENDS)}).")
+            from openai import OpenAI
+            if BACKEND == "local":
+                _client = OpenAI(base_url=LOCAL_BASE_URL, api_key=os.getenv("LLM_API_KEY", "local"))
+            else:
+                if not (api_key.startswith("sk-") and len(api_key) > 40):
+                    raise RuntimeError("OPENAI_API_KEY fehlt oder ist ungültig. Bitte in .env prüfen.")
+                _client = OpenAI(api_key=api_key)
+        return _client
 
 
-_client = OpenAI(api_key=api_key)
-MODEL = "gpt-4o-mini"
+def _get_fake():
+    global _fake
+    with _lock:
+        if _fake is None:
+            from llm_fake import FakeLLM
+            _fake = FakeLLM(latency=float(os.getenv("LLM_FAKE_LATENCY", "0") or 0),
+                            response=os.getenv("LLM_FAKE_RESPONSE") or None)
+        return _fake
+
 
 # Chat-Funktion für KI
-def chat(messages, temperature=0.2):
-    resp = _client.chat.completions.create(
+# timeout: Sekunden pro Anfrage (None = Standard des Clients);
+# response_format z. B. {"type": "json_object"} für strukturierte Antworten
+def chat(messages, temperature=0.2, timeout=None, response_format=None):
+    if BACKEND == "fake":
+        return SimpleNamespace(role="assistant", content=_get_fake().complete(messages, response_format))
+    kwargs = {"timeout": timeout} if timeout is not None else {}
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+    resp = _get_client().chat.completions.create(
         model=MODEL,
         messages=messages,
-        temperature=temperature
+        temperature=temperature,
+        **kwargs
     )
     return resp.choices[0].message
+
+
+# Wie chat, aber mit stream=True: liefert die Text-Deltas, sobald sie eintreffen
+def chat_stream(messages, temperature=0.2, timeout=None):
+    if BACKEND == "fake":
+        yield from _get_fake().stream(messages)
+        return
+    kwargs = {"timeout": timeout} if timeout is not None else {}
+    stream = _get_client().chat.completions.create(
+        model=MODEL,
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+        **kwargs
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
@@ -0,0 +1,131 @@
+# Persistenter Cache für LLM-Antworten (SQLite)
+#
+# Schlüssel ist ein SHA-256 über Modell, Temperatur und den vollständigen Prompt (Schwachstelle,
+# Bedrohung, Asset, Policy-Auszüge). Einträge verfallen nach einer TTL; über der Maximalgröße
+# werden die am längsten nicht genutzten Einträge entfernt. Der Cache überlebt Neustarts und
+# wird von allen Sessions und dem PDF-Export gemeinsam genutzt.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+CACHE_PATH = os.path.join(".cache", "llm_cache.sqlite")
+CACHE_TTL_DAYS = 30.0
+CACHE_MAX_ENTRIES = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used);
+"""
+
+
+def cache_key(prompt: str, model: str, temperature: float) -> str:
+    payload = json.dumps({"model": model, "temperature": temperature, "prompt": prompt},
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str = CACHE_PATH, ttl_days: float = CACHE_TTL_DAYS,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Eine Verbindung pro Thread, Schreibzugriffe serialisiert
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._write_lock:
+            conn = self._conn()
+            conn.executescript(SCHEMA)
+            conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_any([key])
+
+    # Erster gültiger Eintrag unter mehreren gleichwertigen Schlüsseln; zählt als ein
+    # Treffer bzw. ein Fehlgriff, egal wie viele Schlüssel geprüft wurden
+    def get_any(self, keys: List[str]) -> Optional[str]:
+        conn = self._conn()
+        now = time.time()
+        for key in keys:
+            row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl > 0 and now - row[1] > self.ttl):
+                continue
+            with self._write_lock, conn:
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, model: str, response: str):
+        conn = self._conn()
+        now = time.time()
+        with self._write_lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses(key, model, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            self._evict(conn, now)
+
+    # Abgelaufene Einträge löschen, danach auf max_entries kürzen (zuletzt genutzte bleiben)
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        if self.ttl > 0:
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        if self.max_entries > 0:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, int]:
+        size = self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+# Prozessweiter Cache, konfiguriert über LLM_CACHE_PATH / LLM_CACHE_TTL_DAYS / LLM_CACHE_MAX_ENTRIES;
+# LLM_CACHE_PATH leer setzen schaltet den Cache ab (None)
+def get_cache() -> Optional[LLMCache]:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            path = os.getenv("LLM_CACHE_PATH", CACHE_PATH).strip()
+            if not path:
+                return None
+            _cache = LLMCache(
+                path,
+                ttl_days=float(os.getenv("LLM_CACHE_TTL_DAYS", CACHE_TTL_DAYS)),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", CACHE_MAX_ENTRIES)),
+            )
+        return _cache
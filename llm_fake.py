@@ -0,0 +1,75 @@
+# Deterministische Stand-in-Antworten für die KI (Offline, CI, Lasttests)
+#
+# Erzeugt aus dem Prompt eine Antwort im erwarteten Format: Markdown mit HAUPTQUELLE-Trailer
+# für Einzel-Anfragen, JSON {"empfehlungen": [...]} für Sammel-Anfragen. Gleicher Prompt ->
+# gleiche Antwort. Genutzt vom Backend "fake" in llm.py und vom lokalen Server llm_server.py.
+import json
+import re
+import time
+from typing import Iterator, List, Optional
+
+_VULN_RE = re.compile(r"^- Schwachstelle: (.*)$", re.MULTILINE)
+_BATCH_ITEM_RE = re.compile(r"^### SCHWACHSTELLE (\d+)$", re.MULTILINE)
+
+
+def _steps(vuln: str) -> List[str]:
+    return [
+        f"Verantwortlichkeit für das Thema \"{vuln}\" festlegen",
+        "Vorgaben der Richtlinie in eine verbindliche Regelung überführen",
+        "Umsetzung dokumentieren und regelmäßig überprüfen",
+    ]
+
+
+def _why(vuln: str) -> str:
+    return (f"Die Schwachstelle \"{vuln}\" erhöht die Eintrittswahrscheinlichkeit der zugehörigen Bedrohungen. "
+            "Eine geregelte Umsetzung gemäß Richtlinie reduziert das Risiko nachvollziehbar.")
+
+
+def _markdown(vuln: str) -> str:
+    steps = "\n".join(f"{i}. {s}" for i, s in enumerate(_steps(vuln), 1))
+    return (f"### Maßnahmen zu {vuln}\n\n**Warum ist das wichtig?**\n{_why(vuln)}\n\n"
+            f"**Umsetzungsplan:**\n{steps}\n\n---\nHAUPTQUELLE: 1")
+
+
+def _batch_json(prompt: str) -> str:
+    items = []
+    starts = [(int(m.group(1)), m.start()) for m in _BATCH_ITEM_RE.finditer(prompt)]
+    for idx, (nr, start) in enumerate(starts):
+        end = starts[idx + 1][1] if idx + 1 < len(starts) else len(prompt)
+        part = prompt[start:end]
+        vuln = _VULN_RE.search(part)
+        vuln = vuln.group(1).strip() if vuln else f"Schwachstelle {nr}"
+        items.append({"nr": nr, "titel": f"Maßnahmen zu {vuln}", "warum": _why(vuln),
+                      "schritte": _steps(vuln), "hauptquelle": 1, "hinweis": None})
+    return json.dumps({"empfehlungen": items}, ensure_ascii=False)
+
+
+class FakeLLM:
+    # latency: Sekunden pro Antwort (beim Streamen auf die Teilstücke verteilt);
+    # response: feste Antwort für Einzel-Anfragen statt der generierten
+    def __init__(self, latency: float = 0.0, response: Optional[str] = None, chunk_chars: int = 16):
+        self.latency = latency
+        self.response = response
+        self.chunk_chars = chunk_chars
+
+    def reply(self, messages, response_format=None) -> str:
+        prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        if response_format and response_format.get("type") == "json_object":
+            return _batch_json(prompt)
+        if self.response is not None:
+            return self.response
+        vuln = _VULN_RE.search(prompt)
+        return _markdown(vuln.group(1).strip() if vuln else "die Schwachstelle")
+
+    def complete(self, messages, response_format=None) -> str:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return self.reply(messages, response_format)
+
+    def stream(self, messages) -> Iterator[str]:
+        text = self.reply(messages)
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+        for chunk in chunks:
+            if self.latency > 0:
+                time.sleep(self.latency / len(chunks))
+            yield chunk
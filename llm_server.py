@@ -0,0 +1,106 @@
+# Lokaler OpenAI-kompatibler Stand-in-Server (nur /v1/chat/completions und /v1/models)
+#
+# Aufruf:  python llm_server.py [--host 127.0.0.1] [--port 8001] [--latency 0.5] [--response datei.md]
+#
+# Die App nutzt ihn mit LLM_BACKEND=local (LLM_BASE_URL=http://127.0.0.1:8001/v1). Antworten sind
+# deterministisch (llm_fake.py), Streaming (stream=true) wird als Server-Sent Events geliefert.
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_fake import FakeLLM
+
+
+class _Handler(BaseHTTPRequestHandler):
+    llm: FakeLLM = FakeLLM()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "local-stub", "object": "model", "owned_by": "local"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unbekannter Pfad {self.path}"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"Unbekannter Pfad {self.path}"}})
+            return
+        try:
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"error": {"message": f"Ungültiges JSON: {e}"}})
+            return
+        messages = req.get("messages", [])
+        model = req.get("model", "local-stub")
+        cid = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        if req.get("stream"):
+            self._stream(cid, created, model, messages)
+            return
+        text = self.llm.complete(messages, req.get("response_format"))
+        self._send_json(200, {
+            "id": cid, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _stream(self, cid: str, created: int, model: str, messages):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def event(delta: dict, finish=None):
+            chunk = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        for piece in self.llm.stream(messages):
+            event({"content": piece})
+        event({}, finish="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def main():
+    ap = argparse.ArgumentParser(description="OpenAI-kompatibler Stand-in für Offline-Betrieb und Lasttests")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8001)
+    ap.add_argument("--latency", type=float, default=0.0, help="Sekunden pro Antwort")
+    ap.add_argument("--response", default=None, help="Datei mit fester Antwort für Einzel-Anfragen")
+    args = ap.parse_args()
+
+    response = None
+    if args.response:
+        with open(args.response, "r", encoding="utf-8") as f:
+            response = f.read()
+    _Handler.llm = FakeLLM(latency=args.latency, response=response)
+    server = ThreadingHTTPServer((args.host, args.port), _Handler)
+    print(f"✅ LLM-Stand-in läuft auf http://{args.host}:{args.port}/v1 (Latenz {args.latency}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,22 @@
 from io import BytesIO
 from datetime import datetime
 import traceback
+from importlib.util import find_spec
 
 import pandas as pd
 import re
 
-try:
+# reportlab wird erst beim ersten Export geladen; hier nur prüfen, ob es installiert ist
+HAS_REPORTLAB = find_spec("reportlab") is not None
+
+from intake_flow import PROFILE_FIELDS, SMALL_FIELDS
+from recommender import enrich_many_with_policies, llm_actions_many
+# PDF-Export Logik
+
+# Hauptfunktion PDF
+def build_pdf_report(profile_raw, df, vuln_df, policy_search, render_matrix, mode="small", completed_actions=None):
+    if not HAS_REPORTLAB:
+        return None
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.units import cm
     from reportlab.lib import colors
@@ -18,19 +29,6 @@ try:
         Image as RLImage,
     )
     from reportlab.lib.styles import getSampleStyleSheet
-
-    HAS_REPORTLAB = True
-except Exception:
-    HAS_REPORTLAB = False
-
-from intake_flow import PROFILE_FIELDS, SMALL_FIELDS
-from recommender import enrich_with_policies, llm_actions_from_policy_hits
-# PDF-Export Logik
-
-# Hauptfunktion PDF
-def build_pdf_report(profile_raw, df, vuln_df, policy_search, render_matrix, mode="small", completed_actions=None):
-    if not HAS_REPORTLAB:
-        return None
     
     if completed_actions is None:
         completed_actions = set()
@@ -379,32 +377,40 @@ def build_pdf_report(profile_raw, df, vuln_df, policy_search, render_matrix, mod
     if open_vulns.empty:
         story.append(Paragraph("Alle identifizierten Maßnahmen wurden bereits als umgesetzt markiert.", normal))
     else:
-        for _, r in open_vulns.sort_values("Risk", ascending=False).iterrows():
-            nr = int(r["Nr"])
-            vuln_name = str(r["Schwachstelle"])
-
-            story.append(Paragraph(f"Empfehlung #{nr}: {vuln_name}", h3))
-            story.append(Spacer(1, 0.1 * cm))
+        open_rows = [r for _, r in open_vulns.sort_values("Risk", ascending=False).iterrows()]
 
+        # Policy-Treffer für alle offenen Schwachstellen in einem Suchdurchlauf
+        search_items = []
+        for r in open_rows:
             threat_names = r.get("ThreatNames", []) or []
             asset_names = r.get("AssetNames", []) or []
-            first_threat = threat_names[0] if threat_names else ""
-            first_asset = asset_names[0] if asset_names else ""
-
-            try:
-                hits = enrich_with_policies(policy_search, first_threat, vuln_name, first_asset)
-            except Exception:
-                hits = []
-
-            ctx = {
+            search_items.append((
+                threat_names[0] if threat_names else "",
+                str(r["Schwachstelle"]),
+                asset_names[0] if asset_names else "",
+            ))
+        try:
+            all_hits = enrich_many_with_policies(policy_search, search_items)
+        except Exception:
+            all_hits = [[] for _ in search_items]
+
+        # Alle Empfehlungen parallel anfordern; Reihenfolge bleibt die der Schwachstellen
+        requests = []
+        for r, (first_threat, vuln_name, first_asset), hits in zip(open_rows, search_items, all_hits):
+            requests.append((hits, {
                 "asset": first_asset, "threat": first_threat, "vuln": vuln_name,
                 "risk": float(r["Risk"]), "likelihood": float(r["Avg_Likelihood"]),
                 "impact": float(r.get("Avg_Impact", 0))
-            }
+            }))
+        recommendations = llm_actions_many(requests, max_chars=1800)
+
+        for r, (first_threat, vuln_name, first_asset), md in zip(open_rows, search_items, recommendations):
+            nr = int(r["Nr"])
+
+            story.append(Paragraph(f"Empfehlung #{nr}: {vuln_name}", h3))
+            story.append(Spacer(1, 0.1 * cm))
 
-            try:
-                md = llm_actions_from_policy_hits(hits, ctx, max_chars=1800)
-            except Exception:
+            if md is None:
                 md = "Keine Empfehlung verfügbar."
 
             parts = md.split("---")
@@ -0,0 +1,283 @@
+# SQLite/FTS5-Backend für die Policy-Suche
+#
+# Seitentexte und (Datei, Seite) liegen in einer lokalen SQLite-Datenbank statt im
+# Index-Artefakt. FTS5 liefert eine Kandidatenmenge (bm25-sortiert), TF-IDF bewertet nur
+# diese Kandidaten: die char-n-Gramm-Zählungen (gehasht) werden beim Einfügen je Seite
+# gespeichert, die IDF kommt aus der Kandidatenmenge. PDFs werden einzeln eingefügt/gelöscht;
+# Snippets kommen per Direktzugriff auf die jeweilige Seite (Schlagwort-Positionen ebenfalls
+# beim Einfügen gespeichert), der Korpus wird nie komplett geladen.
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from policy_search import (HASHING_FEATURES, QUERY_CACHE_SIZE, SNIPPET_MAX_CHARS, HashingEncoder, LRUCache,
+                           PolicyHit, ProgressFn, SortedTerms, TermPositions, _keyword_window, _keywords_from_query,
+                           _list_pdfs, _normalize_query, _normalize_text, _top_k, _unchanged, _word_tokens,
+                           build_corpus)
+
+DB_FILE = "policy_pages.sqlite"
+
+# Kandidaten aus FTS5, die anschließend mit TF-IDF bewertet werden
+FTS_CANDIDATES = 200
+
+# Bei Änderungen am Schema erhöhen: Datenbanken mit anderer Version werden verworfen und neu aufgebaut
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    size INTEGER, mtime REAL, sha256 TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    page INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    -- gehashte char-n-Gramm-Zählungen: Spalten (int32) und Werte (float32)
+    vec_idx BLOB NOT NULL,
+    vec_cnt BLOB NOT NULL,
+    -- Schlagwort-Positionen (wie TermPositions): sortierte Terme der Seite, zeilengetrennt,
+    -- dazu je Vorkommen Term-ID und Zeichen-Offset (int32)
+    pos_terms TEXT NOT NULL,
+    pos_ids BLOB NOT NULL,
+    pos_chars BLOB NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS pages_file_page ON pages(file_id, page);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    text, content='pages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+    INSERT INTO pages_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+    INSERT INTO pages_fts(pages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+# FTS5-Ausdruck: Query-Wörter als Phrasen, ODER-verknüpft
+def _fts_query(query: str) -> str:
+    terms = []
+    for t in _word_tokens(query):
+        if t not in terms:
+            terms.append(t)
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+def _page_positions(txt: str) -> Tuple[str, bytes, bytes]:
+    tp = TermPositions.from_texts([txt])
+    return ("\n".join(tp.terms.tolist()), tp.term_ids.astype(np.int32).tobytes(),
+            tp.chars.astype(np.int32).tobytes())
+
+
+def _stored_positions(terms: str, ids: bytes, chars: bytes) -> TermPositions:
+    term_ids = np.frombuffer(ids, dtype=np.int32)
+    return TermPositions(SortedTerms.from_list(terms.split("\n") if terms else []),
+                         np.array([0, term_ids.shape[0]], dtype=np.int64), term_ids,
+                         np.frombuffer(chars, dtype=np.int32))
+
+
+# TF-IDF über die Kandidaten: IDF aus deren Dokumenthäufigkeit (wie TfidfVectorizer, smooth_idf)
+def _candidate_scores(counts: csr_matrix, query_counts: csr_matrix) -> np.ndarray:
+    from sklearn.preprocessing import normalize
+    n = counts.shape[0]
+    df = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = (np.log((1 + n) / (1 + df)) + 1.0).astype(np.float32)
+    X = counts.copy()
+    X.data *= idf[X.indices]
+    q = query_counts.copy()
+    q.data *= idf[q.indices]
+    return (normalize(X) @ normalize(q).T).toarray().ravel()
+
+
+class FTSPolicySearch:
+    def __init__(self, policy_dir: str, workers: int = 1, db_path: Optional[str] = None,
+                 candidates: int = FTS_CANDIDATES, query_cache_size: int = QUERY_CACHE_SIZE,
+                 files: Optional[List[str]] = None, progress: Optional[ProgressFn] = None):
+        self.policy_dir = policy_dir
+        self.workers = workers
+        self.db_path = db_path or os.path.join(policy_dir, DB_FILE)
+        self.candidates = candidates
+        self.files = set(files) if files is not None else None
+        self.progress = progress
+        self.query_cache_size = query_cache_size
+        self._encoder = HashingEncoder(n_features=HASHING_FEATURES)
+        # Einlesedauer pro Datei in Sekunden (nur für beim letzten Abgleich gelesene PDFs)
+        self.ingest_timings: Dict[str, float] = {}
+        self._hit_cache = LRUCache(query_cache_size)
+        # Eine Verbindung pro Thread (Streamlit-Sessions laufen in eigenen Threads)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(policy_dir, exist_ok=True)
+        with self._write_lock:
+            conn = self._conn()
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # Anderes Layout: Tabellen verwerfen, rebuild() liest alle PDFs neu ein
+                conn.executescript("DROP TABLE IF EXISTS pages_fts; DROP TABLE IF EXISTS pages; "
+                                   "DROP TABLE IF EXISTS files;")
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        self.rebuild()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            # WAL: Leser sehen während eines Abgleichs weiter den letzten Stand
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _policy_files(self) -> List[str]:
+        files = _list_pdfs(self.policy_dir)
+        if self.files is not None:
+            files = [fn for fn in files if fn in self.files]
+        return files
+
+    def _fingerprints(self) -> Dict[str, Dict[str, object]]:
+        rows = self._conn().execute("SELECT name, size, mtime, sha256 FROM files").fetchall()
+        return {name: {"size": size, "mtime": mtime, "sha256": sha} for name, size, mtime, sha in rows}
+
+    def is_stale(self) -> bool:
+        fps = self._fingerprints()
+        files = self._policy_files()
+        if set(files) != set(fps):
+            return True
+        return any(not _unchanged(fps[fn], os.path.join(self.policy_dir, fn))[0] for fn in files)
+
+    # Abgleich mit dem Ordner: neue/geänderte PDFs einfügen, entfernte löschen (je PDF eine Transaktion)
+    def rebuild(self):
+        with self._write_lock:
+            conn = self._conn()
+            old = self._fingerprints()
+            files = self._policy_files()
+            stale: List[str] = []
+            fps: Dict[str, Dict[str, object]] = {}
+            for fn in files:
+                same, fp = _unchanged(old.get(fn), os.path.join(self.policy_dir, fn))
+                if not same:
+                    stale.append(fn)
+                    fps[fn] = fp
+                elif fp is not old[fn]:
+                    # Nur berührt (neue mtime, gleicher Inhalt): Fingerprint nachziehen, sonst wird
+                    # die Datei bei jedem Abgleich erneut gehasht
+                    with conn:
+                        conn.execute("UPDATE files SET size = ?, mtime = ?, sha256 = ? WHERE name = ?",
+                                     (fp["size"], fp["mtime"], fp["sha256"], fn))
+
+            for fn in old:
+                if fn not in files:
+                    with conn:
+                        conn.execute("DELETE FROM files WHERE name = ?", (fn,))
+
+            self.ingest_timings = {}
+            docs, meta = build_corpus(self.policy_dir, workers=self.workers, timings=self.ingest_timings,
+                                      files=stale, progress=self.progress)
+            pages: Dict[str, List[Tuple[int, str]]] = {fn: [] for fn in stale}
+            for txt, (fn, page) in zip(docs, meta):
+                pages[fn].append((page, txt))
+            for fn in stale:
+                fp = fps[fn]
+                counts = self._encoder.hasher.transform([txt for _, txt in pages[fn]]) if pages[fn] else None
+                rows = []
+                for i, (page, txt) in enumerate(pages[fn]):
+                    lo, hi = counts.indptr[i], counts.indptr[i + 1]
+                    rows.append((page, txt, counts.indices[lo:hi].astype(np.int32).tobytes(),
+                                 counts.data[lo:hi].astype(np.float32).tobytes(), *_page_positions(txt)))
+                with conn:
+                    conn.execute("DELETE FROM files WHERE name = ?", (fn,))
+                    cur = conn.execute("INSERT INTO files(name, size, mtime, sha256) VALUES (?, ?, ?, ?)",
+                                       (fn, fp["size"], fp["mtime"], fp.get("sha256")))
+                    conn.executemany("INSERT INTO pages(file_id, page, text, vec_idx, vec_cnt, pos_terms, pos_ids, "
+                                     "pos_chars) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                     [(cur.lastrowid, *row) for row in rows])
+            if stale or set(old) - set(files):
+                self._hit_cache.clear()
+
+    # Gleiche Datenbank, frische Instanz: der Abgleich ist transaktional, Leser bleiben konsistent
+    def next_generation(self, progress: Optional[ProgressFn] = None) -> "FTSPolicySearch":
+        return FTSPolicySearch(self.policy_dir, workers=self.workers, db_path=self.db_path,
+                               candidates=self.candidates, query_cache_size=self.query_cache_size,
+                               files=self.files, progress=progress)
+
+    # (Text, Terme, Term-IDs, Zeichen-Offsets) einer Seite oder None
+    def _page(self, file: str, page: int) -> Optional[Tuple[str, Optional[str], bytes, bytes]]:
+        return self._conn().execute(
+            "SELECT p.text, p.pos_terms, p.pos_ids, p.pos_chars FROM pages p JOIN files f ON f.id = p.file_id "
+            "WHERE f.name = ? AND p.page = ?",
+            (file, page),
+        ).fetchone()
+
+    def _page_text(self, file: str, page: int) -> str:
+        row = self._page(file, page)
+        return row[0] if row else ""
+
+    def _candidates(self, query: str) -> List[Tuple[str, int, str, bytes, bytes]]:
+        expr = _fts_query(query)
+        if not expr:
+            return []
+        sql = ("SELECT f.name, p.page, p.text, p.vec_idx, p.vec_cnt FROM pages_fts "
+               "JOIN pages p ON p.id = pages_fts.rowid JOIN files f ON f.id = p.file_id "
+               "WHERE pages_fts MATCH ? ")
+        args: list = [expr]
+        if self.files is not None:
+            sql += f"AND f.name IN ({','.join('?' * len(self.files))}) "
+            args += sorted(self.files)
+        sql += "ORDER BY bm25(pages_fts) LIMIT ?"
+        args.append(self.candidates)
+        return self._conn().execute(sql, args).fetchall()
+
+    def _snippet(self, file: str, page: int, text: str, query: str) -> Tuple[int, str]:
+        kws = _keywords_from_query(query)
+        if not kws:
+            return page, text[:SNIPPET_MAX_CHARS]
+        for p in [page] + ([page - 1] if page > 1 else []) + [page + 1]:
+            row = self._page(file, p)
+            if row is None or not row[0]:
+                continue
+            hits = _stored_positions(*row[1:]).hits(0, kws)
+            if hits:
+                return p, _keyword_window(row[0], hits)
+        return page, text[:SNIPPET_MAX_CHARS]
+
+    def search(self, query: str, k: int = 7) -> List[PolicyHit]:
+        key = (_normalize_query(query), k)
+        cached = self._hit_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        cands = self._candidates(query)
+        if not cands:
+            return []
+        indices = [np.frombuffer(c[3], dtype=np.int32) for c in cands]
+        data = [np.frombuffer(c[4], dtype=np.float32) for c in cands]
+        indptr = np.concatenate([[0], np.cumsum([len(ix) for ix in indices])])
+        counts = csr_matrix((np.concatenate(data), np.concatenate(indices), indptr),
+                            shape=(len(cands), HASHING_FEATURES))
+        sims = _candidate_scores(counts, self._encoder.hasher.transform([query]))
+        hits = []
+        for i in _top_k(sims, k):
+            file, page, text = cands[i][:3]
+            ver_page, snippet = self._snippet(file, page, text, query)
+            hits.append(PolicyHit(file=file, page=ver_page, score=float(sims[i]),
+                                  snippet=_normalize_text(snippet), orig_page=page))
+        self._hit_cache.put(key, hits)
+        return list(hits)
+
+    def search_many(self, queries: List[str], k: int = 7) -> List[List[PolicyHit]]:
+        return [self.search(q, k=k) for q in queries]
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {"vectors": {"hits": 0, "misses": 0, "size": 0}, "hits": self._hit_cache.stats()}
+
+    def list_files(self) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT f.name FROM files f WHERE EXISTS (SELECT 1 FROM pages p WHERE p.file_id = f.id) ORDER BY f.name"
+        ).fetchall()
+        return [name for (name,) in rows if self.files is None or name in self.files]
@@ -0,0 +1,141 @@
+# Binäres Index-Format für PolicySearch (ein Artefakt, pickle-frei, per mmap lesbar)
+#
+# Aufbau:  MAGIC (8 Byte) | Header-Länge (uint64) | JSON-Header | Arrays (je 64-Byte-aligned)
+# Der Header beschreibt jedes Array mit dtype, shape und Offset; alles Weitere
+# (Dateiliste, Fingerprints, Vectorizer-Parameter) steht unter "meta". "sha256" ist die
+# Prüfsumme über den gesamten Datenbereich (ab dem ersten Array bis Dateiende).
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Tuple
+
+import numpy as np
+
+MAGIC = b"PSIDX\x00\x00\x00"
+FORMAT_VERSION = 1
+ALIGN = 64
+
+
+class IndexFormatError(Exception):
+    pass
+
+
+def _pad(n: int) -> int:
+    return (-n) % ALIGN
+
+
+def write_index(path: str, arrays: Dict[str, np.ndarray], meta: dict):
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+
+    # Offsets relativ zum Datenbereich; der Datenbereich beginnt aligned nach dem Header
+    layout = {}
+    pos = 0
+    digest = hashlib.sha256()
+    for name, a in arrays.items():
+        layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": pos}
+        pos += a.nbytes + _pad(a.nbytes)
+        digest.update(a.tobytes())
+        digest.update(b"\x00" * _pad(a.nbytes))
+
+    header = json.dumps({
+        "format_version": FORMAT_VERSION,
+        "sha256": digest.hexdigest(),
+        "arrays": layout,
+        "meta": meta,
+    }, ensure_ascii=False).encode("utf-8")
+    prefix = len(MAGIC) + 8 + len(header)
+    data_start = prefix + _pad(prefix)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\x00" * (data_start - prefix))
+        for a in arrays.values():
+            f.write(a.tobytes())
+            f.write(b"\x00" * _pad(a.nbytes))
+        f.flush()
+        os.fsync(f.fileno())
+    # Atomarer Austausch: laufende Leser behalten ihre alte Abbildung
+    os.replace(tmp, path)
+
+
+def read_index(path: str, verify: bool = False) -> Tuple[dict, Dict[str, np.ndarray]]:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise IndexFormatError(f"{path} ist kein PolicySearch-Index.")
+        (hlen,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(hlen).decode("utf-8"))
+        if header.get("format_version") != FORMAT_VERSION:
+            raise IndexFormatError(
+                f"Index-Version {header.get('format_version')} wird nicht unterstützt "
+                f"(erwartet {FORMAT_VERSION})."
+            )
+        size = os.fstat(f.fileno()).st_size
+        if os.name == "nt":
+            # Windows sperrt gemappte Dateien gegen os.replace; dort wird der Index eingelesen
+            f.seek(0)
+            mm = f.read()
+        else:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    prefix = len(MAGIC) + 8 + hlen
+    data_start = prefix + _pad(prefix)
+
+    if verify:
+        expected = header.get("sha256")
+        if not expected:
+            raise IndexFormatError(f"{path} enthält keine Prüfsumme.")
+        actual = hashlib.sha256(memoryview(mm)[data_start:] if mm is not None else b"").hexdigest()
+        if actual != expected:
+            raise IndexFormatError(f"Prüfsumme von {path} stimmt nicht (Datei beschädigt oder unvollständig).")
+
+    arrays: Dict[str, np.ndarray] = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        count = int(np.prod(shape)) if shape else 1
+        if count == 0:
+            arrays[name] = np.empty(shape, dtype=dtype)
+            continue
+        # Zero-copy-Sicht auf die Datei; Seiten teilen sich alle Prozesse über den OS-Cache
+        a = np.frombuffer(mm, dtype=dtype, count=count, offset=data_start + spec["offset"])
+        arrays[name] = a.reshape(shape)
+    return header["meta"], arrays
+
+
+# Nur den Header lesen (Version, Prüfsumme, Meta), ohne die Arrays abzubilden
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise IndexFormatError(f"{path} ist kein PolicySearch-Index.")
+        (hlen,) = struct.unpack("<Q", f.read(8))
+        return json.loads(f.read(hlen).decode("utf-8"))
+
+
+# Liste von Strings <-> UTF-8-Blob + Offset-Tabelle
+def pack_strings(items) -> Tuple[np.ndarray, np.ndarray]:
+    parts = [s.encode("utf-8") for s in items]
+    offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in parts], out=offsets[1:])
+    blob = np.frombuffer(b"".join(parts), dtype=np.uint8)
+    return blob, offsets
+
+
+def unpack_strings(blob: np.ndarray, offsets: np.ndarray):
+    raw = blob.tobytes()
+    bounds = offsets.tolist()
+    return [raw[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+
+# True, wenn das Array (auch über Sichten) direkt auf der Index-Datei liegt
+def is_mapped(a) -> bool:
+    base = a
+    while isinstance(base, np.ndarray):
+        base = base.base
+    if isinstance(base, memoryview):
+        base = base.obj
+    return isinstance(base, mmap.mmap)
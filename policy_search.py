@@ -1,11 +1,20 @@
+import hashlib
+import heapq
+import multiprocessing
 import os
-import pickle
 import re
-from dataclasses import dataclass
-from typing import List, Tuple
-from PyPDF2 import PdfReader, errors
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
+import shutil
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix, vstack as sp_vstack
+
+from policy_index import read_index, write_index, pack_strings, unpack_strings, is_mapped
 
 
 @dataclass
@@ -15,26 +24,51 @@ class PolicyHit:
     score: float
     snippet: str
     orig_page: int    
+    char_offset: int = 0
+    # Nahezu gleiche Seiten anderer Stellen/PDFs, die nicht separat indexiert sind
+    alternates: List[Tuple[str, int]] = field(default_factory=list)
+
+INDEX_FILE = "policy_index.bin"
+
+# Unterordner für die Einzel-Indizes im Shard-Modus
+SHARD_DIR = ".shards"
+
+# Pickle-Caches früherer Versionen; werden beim nächsten Speichern entfernt
+LEGACY_CACHE_FILES = ["index.pkl", "vectorizer.pkl", "meta.pkl", "docs.pkl"]
 
-CACHE_FILES = {
-    "index": "index.pkl",
-    "vectorizer": "vectorizer.pkl",
-    "meta": "meta.pkl",
-    "docs": "docs.pkl",
-}
+VECTORIZER_PARAMS = dict(
+    analyzer="char_wb",
+    ngram_range=(3, 5),
+    max_df=0.95,
+    min_df=1,
+    lowercase=True
+)
 
 SNIPPET_MAX_CHARS = 900
+# Auszugsfenster um die dichteste Stelle mit Query-Schlagworten
+SNIPPET_WINDOW_CHARS = 600
+
+# Fenstergröße/Überlappung (Zeichen) im Chunk-Modus
+CHUNK_CHARS = 600
+CHUNK_OVERLAP = 150
+
+# Fortschritts-Callback: (erledigt, gesamt, Beschriftung)
+ProgressFn = Callable[[int, int, str], None]
+
+# Seiten pro Arbeitspaket beim parallelen Einlesen
+PAGES_PER_TASK = 40
 
 # PDF-Seiten auslesen
-def _read_pdf_pages(path: str) -> List[str]:
+def _read_pdf_pages(path: str, start: int = 0, stop: Optional[int] = None) -> List[str]:
+    from PyPDF2 import PdfReader, errors
     pages = []
     try:
         reader = PdfReader(path)
-        for p in reader.pages:
+        for p in reader.pages[start:stop]:
             try:
                 text = p.extract_text()
                 if text and len(text.strip()) > 30:
-                    pages.append(text)
+                    pages.append(_normalize_text(text))
                 else:
                     pages.append("")
             except Exception:
@@ -44,90 +78,1144 @@ def _read_pdf_pages(path: str) -> List[str]:
     return pages
 
 
-def build_corpus(policy_dir: str) -> Tuple[List[str], List[Tuple[str,int]]]:
-    docs = []; meta = []
-    for fn in os.listdir(policy_dir):
-        if not fn.lower().endswith(".pdf"):
-            continue
+def _pdf_page_count(path: str) -> int:
+    from PyPDF2 import PdfReader, errors
+    try:
+        return len(PdfReader(path).pages)
+    except errors.PdfReadError:
+        print(f"⚠️ {path} konnte nicht gelesen werden.")
+        return 0
+
+
+# Arbeitspaket für den Prozess-Pool
+def _extract_page_range(path: str, start: int, stop: int) -> Tuple[List[str], float]:
+    t0 = time.perf_counter()
+    pages = _read_pdf_pages(path, start, stop)
+    return pages, time.perf_counter() - t0
+
+
+def _list_pdfs(policy_dir: str) -> List[str]:
+    return sorted(fn for fn in os.listdir(policy_dir) if fn.lower().endswith(".pdf"))
+
+
+def _extract_parallel(policy_dir: str, files: List[str], workers: int,
+                      timings: Optional[Dict[str, float]],
+                      progress: Optional[ProgressFn] = None) -> Iterator[Tuple[str, List[str]]]:
+    # Große Dateien werden in Seitenbereiche aufgeteilt
+    tasks = []
+    for fn in files:
+        n = _pdf_page_count(os.path.join(policy_dir, fn))
+        for start in range(0, n, PAGES_PER_TASK):
+            tasks.append((fn, start, min(n, start + PAGES_PER_TASK)))
+
+    # Ergebnisse in Aufgabenreihenfolge abholen; höchstens 2 * workers Pakete gleichzeitig
+    # unterwegs, damit fertige, aber noch nicht abgeholte Seiten den Speicher nicht füllen.
+    # "spawn" statt fork: Aufrufer sind Streamlit-Server und IndexManager-Thread, ein Fork
+    # würde dort gehaltene Locks in die Kindprozesse übernehmen
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending: "deque[Tuple[str, Future]]" = deque()
+        todo = iter(tasks)
+
+        def fill():
+            while len(pending) < 2 * workers:
+                task = next(todo, None)
+                if task is None:
+                    return
+                fn, start, stop = task
+                pending.append((fn, pool.submit(_extract_page_range, os.path.join(policy_dir, fn), start, stop)))
+
+        fill()
+        done = 0
+        for fn in files:
+            pages: List[str] = []
+            # Pakete liegen in Dateireihenfolge vor; PDFs ohne Seiten haben keine
+            while pending and pending[0][0] == fn:
+                _, fut = pending.popleft()
+                part, secs = fut.result()
+                fill()
+                done += 1
+                pages.extend(part)
+                if timings is not None:
+                    timings[fn] = timings.get(fn, 0.0) + secs
+                if progress is not None:
+                    progress(done, len(tasks), fn)
+            yield fn, pages
+
+
+# PDFs dateiweise einlesen: liefert (Datei, Seitentexte) in sortierter Reihenfolge,
+# ohne den gesamten Korpus auf einmal im Speicher zu halten
+def iter_corpus(policy_dir: str, workers: int = 1,
+                timings: Optional[Dict[str, float]] = None,
+                files: Optional[List[str]] = None,
+                progress: Optional[ProgressFn] = None) -> Iterator[Tuple[str, List[str]]]:
+    files = _list_pdfs(policy_dir) if files is None else sorted(files)
+    if workers > 1 and files:
+        for fn, pages in _extract_parallel(policy_dir, files, workers, timings, progress):
+            yield fn, [txt or "" for txt in pages]
+        return
+    for done, fn in enumerate(files, start=1):
+        t0 = time.perf_counter()
         pages = _read_pdf_pages(os.path.join(policy_dir, fn))
-        for i, txt in enumerate(pages): 
-            docs.append(txt or "")
+        if timings is not None:
+            timings[fn] = time.perf_counter() - t0
+        if progress is not None:
+            progress(done, len(files), fn)
+        yield fn, [txt or "" for txt in pages]
+
+
+def build_corpus(policy_dir: str, workers: int = 1,
+                 timings: Optional[Dict[str, float]] = None,
+                 files: Optional[List[str]] = None,
+                 progress: Optional[ProgressFn] = None) -> Tuple[List[str], List[Tuple[str,int]]]:
+    docs = []; meta = []
+    for fn, pages in iter_corpus(policy_dir, workers=workers, timings=timings, files=files, progress=progress):
+        for i, txt in enumerate(pages):
+            docs.append(txt)
             meta.append((fn, i+1))
     return docs, meta
 
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# Fingerprint einer PDF (Größe, Änderungszeit, Inhalts-Hash)
+def _file_fingerprint(path: str, with_hash: bool = True) -> Dict[str, object]:
+    st = os.stat(path)
+    return {
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "sha256": _sha256(path) if with_hash else None,
+    }
+
+
+def _unchanged(old: Optional[Dict[str, object]], path: str) -> Tuple[bool, Dict[str, object]]:
+    # Größe + mtime gleich -> kein Hash nötig; sonst entscheidet der Inhalts-Hash
+    fp = _file_fingerprint(path, with_hash=False)
+    if old and old["size"] == fp["size"] and old["mtime"] == fp["mtime"]:
+        return True, old
+    fp["sha256"] = _sha256(path)
+    return bool(old) and old.get("sha256") == fp["sha256"], fp
+
+
 def _normalize_text(s: str) -> str:
     s = (s or "").replace("\u00ad", "")
     s = re.sub(r"\s+", " ", s).strip()
     return s
 
+_KEYWORD_RE = re.compile(r"[A-Za-zÄÖÜäöüß0-9\-]{4,}")
+
 def _keywords_from_query(q: str) -> List[str]:
-    toks = re.findall(r"[A-Za-zÄÖÜäöüß0-9\-]{4,}", (q or "").lower())
+    toks = _KEYWORD_RE.findall((q or "").lower())
     out = []
     for t in toks:
         if t not in out:
             out.append(t)
     return out[:10]
 
+# Überlappende Textfenster einer Seite als (Offset, Länge), an Wortgrenzen ausgerichtet
+def _chunk_spans(text: str, size: int, overlap: int) -> List[Tuple[int, int]]:
+    spans = []
+    n = len(text)
+    step = max(1, size - overlap)
+    start = 0
+    while start < n:
+        end = min(n, start + size)
+        if end < n:
+            cut = text.rfind(" ", start + step, end)
+            if cut > start:
+                end = cut
+        spans.append((start, end - start))
+        if end >= n:
+            break
+        nxt = start + step
+        if text[nxt - 1] != " ":
+            sp = text.rfind(" ", start + 1, nxt)
+            if sp > start:
+                nxt = sp + 1
+        start = nxt
+    return spans
+
+
+# Verfügbare Such-Engines
+ENGINES = ("tfidf", "lsa", "hashing", "bm25")
+
+# LSA: Zieldimension und Zahl der Kandidaten für das exakte Re-Ranking
+LSA_COMPONENTS = 256
+RERANK_DEPTH = 50
+# LSA: Projektion nur über die Features mit der höchsten Dokumentfrequenz. Seltene n-Gramme
+# tragen kaum zu den Komponenten bei, ihre Ladungen wären aber der Großteil von lsa_terms
+LSA_MAX_FEATURES = 20000
+
+# Near-Duplicate-Seiten: MinHash über Zeichen-Shingles (ohne Leer-/Satzzeichen, robust gegen
+# zerrissene Wörter aus der PDF-Extraktion), LSH-Bänder liefern Kandidatenpaare; ab
+# DEDUP_THRESHOLD (geschätzte Jaccard-Ähnlichkeit) wird nur ein Vertreter indexiert
+DEDUP_THRESHOLD = 0.7
+MINHASH_PERM = 128
+LSH_BANDS = 32
+SHINGLE_CHARS = 9
+
+
+def _minhash_signatures(texts: List[str]) -> List[Optional[np.ndarray]]:
+    rng = np.random.RandomState(1)
+    # Multiply-Shift-Hashing: ((a * x + b) mod 2^64) >> 32, a ungerade
+    a = rng.randint(1, 2 ** 62, size=MINHASH_PERM, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.randint(0, 2 ** 62, size=MINHASH_PERM, dtype=np.int64).astype(np.uint64)
+    mult = rng.randint(1, 2 ** 62, size=SHINGLE_CHARS, dtype=np.int64).astype(np.uint64)
+    sigs: List[Optional[np.ndarray]] = []
+    for txt in texts:
+        chars = re.sub(r"[\W_]+", "", txt.lower()).encode("utf-32-le")
+        codes = np.frombuffer(chars, dtype=np.uint32).astype(np.uint64)
+        n = codes.shape[0] - SHINGLE_CHARS + 1
+        if n <= 0:
+            sigs.append(None)
+            continue
+        sh = np.zeros(n, dtype=np.uint64)
+        for j in range(SHINGLE_CHARS):
+            sh += codes[j:j + n] * mult[j]
+        sh = np.unique(sh)
+        sigs.append(((a[:, None] * sh[None, :] + b[:, None]) >> np.uint64(32)).min(axis=1))
+    return sigs
+
+
+# Seite -> Vertreter-Seite (Zeile in meta), -1 für eigenständige Seiten und Vertreter selbst
+def _near_duplicates(texts: List[str], threshold: float = DEDUP_THRESHOLD) -> np.ndarray:
+    sigs = _minhash_signatures(texts)
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = MINHASH_PERM // LSH_BANDS
+    for band in range(LSH_BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        for i, sig in enumerate(sigs):
+            if sig is not None:
+                buckets.setdefault(sig[band * rows:(band + 1) * rows].tobytes(), []).append(i)
+        for members in buckets.values():
+            first = members[0]
+            for i in members[1:]:
+                if find(i) != find(first) and np.mean(sigs[i] == sigs[first]) >= threshold:
+                    # Vertreter ist jeweils die erste Seite (Dateireihenfolge)
+                    ri, rf = find(i), find(first)
+                    parent[max(ri, rf)] = min(ri, rf)
+
+    dup_of = np.full(len(texts), -1, dtype=np.int32)
+    for i in range(len(texts)):
+        root = find(i)
+        if root != i:
+            dup_of[i] = root
+    return dup_of
+
+
+# Kompaktierung nach dem Fit: Features unter dieser Dokumenthäufigkeit bzw. Maximalgewicht
+# entfallen (1 / 0.0 = nichts beschneiden; float32 und leere Zeilen entfallen immer)
+PRUNE_MIN_DF = 1
+PRUNE_MIN_WEIGHT = 0.0
+
+
+# Hashing-Engine: Feature-Raum und Seiten pro Batch beim Indexaufbau
+HASHING_FEATURES = 2 ** 20
+HASHING_BATCH = 256
+
+
+def _batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for it in items:
+        batch.append(it)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Zustandsloser Vectorizer: gehashte char-n-Gramme + gespeicherte IDF-Gewichte (kein Vokabular)
+class HashingEncoder:
+    def __init__(self, idf: Optional[np.ndarray] = None, n_features: int = HASHING_FEATURES):
+        self.n_features = n_features
+        self.idf_ = idf
+        self._hasher_obj = None
+
+    # sklearn erst bei der ersten Query bzw. beim Aufbau laden, nicht schon beim Anhängen des Index
+    @property
+    def hasher(self):
+        if self._hasher_obj is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            self._hasher_obj = HashingVectorizer(
+                analyzer=VECTORIZER_PARAMS["analyzer"],
+                ngram_range=VECTORIZER_PARAMS["ngram_range"],
+                lowercase=VECTORIZER_PARAMS["lowercase"],
+                n_features=self.n_features,
+                alternate_sign=False,
+                norm=None,
+                dtype=np.float32,
+            )
+        return self._hasher_obj
+
+    def _weight(self, counts) -> csr_matrix:
+        from sklearn.preprocessing import normalize
+        X = counts.astype(self.idf_.dtype)
+        X.data *= self.idf_[X.indices]
+        X = normalize(X)
+        X.eliminate_zeros()
+        return X
+
+    def transform(self, texts: List[str]) -> csr_matrix:
+        return self._weight(self.hasher.transform(texts))
+
+    # 1. Durchlauf: nur Dokumenthäufigkeit und Zahl der Einträge, die Zählungen werden verworfen;
+    # 2. Durchlauf: Batches erneut hashen, gewichten und direkt in vorab belegte CSR-Arrays schreiben.
+    # batches() muss bei jedem Aufruf dieselben Zeilen liefern (z. B. aus dem PageStore).
+    def fit_transform_batches(self, batches: Callable[[], Iterable[List[str]]]) -> csr_matrix:
+        df = np.zeros(self.n_features, dtype=np.int64)
+        n = nnz = 0
+        for batch in batches():
+            counts = self.hasher.transform(batch)
+            df += np.bincount(counts.indices, minlength=self.n_features)
+            n += counts.shape[0]
+            nnz += counts.nnz
+        idf = np.log((1 + n) / (1 + df)) + 1.0
+        # wie max_df beim TfidfVectorizer: zu häufige Features tragen nichts bei
+        idf[df > VECTORIZER_PARAMS["max_df"] * n] = 0.0
+        self.idf_ = idf
+
+        # nnz ist eine obere Schranke (max_df-Features fallen beim Gewichten weg)
+        data = np.empty(nnz, dtype=idf.dtype)
+        indices = np.empty(nnz, dtype=np.int32)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        row = pos = 0
+        for batch in batches():
+            X = self._weight(self.hasher.transform(batch))
+            data[pos:pos + X.nnz] = X.data
+            indices[pos:pos + X.nnz] = X.indices
+            indptr[row + 1:row + 1 + X.shape[0]] = X.indptr[1:] + pos
+            row += X.shape[0]
+            pos += X.nnz
+        return csr_matrix((data[:pos], indices[:pos], indptr), shape=(n, self.n_features))
+
+
+# Sortierte Termliste als UTF-8-Blob + Offsets (wie die Seitentexte): liegt per mmap im Index
+# und wird von allen Prozessen geteilt, statt pro Prozess ein dict mit allen Termen aufzubauen.
+# UTF-8 sortiert bytewise wie str nach Codepoints, daher Binärsuche direkt auf den Bytes.
+class SortedTerms:
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+        # memoryviews: Zugriff ohne numpy-Skalare (bisect ruft __getitem__ pro Vergleich)
+        self._raw = memoryview(blob)
+        self._off = memoryview(offsets)
+
+    @classmethod
+    def from_list(cls, terms: List[str]) -> "SortedTerms":
+        return cls(*pack_strings(terms))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    # Term i als UTF-8-Bytes (für bisect)
+    def __getitem__(self, i: int) -> bytes:
+        return self._raw[self._off[i]:self._off[i + 1]].tobytes()
+
+    def tolist(self) -> List[str]:
+        return unpack_strings(self.blob, self.offsets)
+
+    # Teilmenge (idx aufsteigend), z. B. nach dem Beschneiden von Spalten
+    def take(self, idx: np.ndarray) -> "SortedTerms":
+        return SortedTerms.from_list([self[i].decode("utf-8") for i in idx])
+
+    # Terme -> Positionen (unbekannte Terme fallen weg)
+    def lookup(self, keys: List[str]) -> np.ndarray:
+        n = len(self)
+        out = []
+        for key in keys:
+            k = key.encode("utf-8")
+            i = bisect_left(self, k)
+            if i < n and self[i] == k:
+                out.append(i)
+        return np.array(out, dtype=np.int64)
+
+    # IDs aller Terme, die sub enthalten: Suche im Blob (überlappend per Lookahead),
+    # Fundstellen über eine Termgrenze hinweg fallen weg
+    def containing(self, sub: str) -> np.ndarray:
+        k = sub.encode("utf-8")
+        starts = np.array([m.start() for m in re.finditer(b"(?=" + re.escape(k) + b")", self._raw)],
+                          dtype=np.int64)
+        if starts.shape[0] == 0:
+            return np.empty(0, dtype=np.int64)
+        ids = np.searchsorted(self.offsets, starts, side="right") - 1
+        return np.unique(ids[starts + len(k) <= self.offsets[ids + 1]])
+
+    def arrays(self, name: str) -> Dict[str, np.ndarray]:
+        return {f"{name}_blob": self.blob, f"{name}_offsets": self.offsets}
+
+
+def _sorted_terms(arrays: Dict[str, np.ndarray], name: str) -> SortedTerms:
+    return SortedTerms(arrays[name + "_blob"], arrays[name + "_offsets"])
+
+
+# Query-Encoder für die TF-IDF/LSA-Engine: gleiche Gewichtung wie TfidfVectorizer.transform,
+# aber mit Lookup in der sortierten Termliste (Spalte = Position, sklearn sortiert das Vokabular)
+class VocabEncoder:
+    def __init__(self, terms: SortedTerms, idf: np.ndarray):
+        self.terms = terms
+        self.idf_ = idf
+        self._analyzer = None
+
+    # Analyzer (sklearn) erst bei der ersten Query bauen
+    def _analyze(self, text: str) -> List[str]:
+        if self._analyzer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            self._analyzer = TfidfVectorizer(**VECTORIZER_PARAMS).build_analyzer()
+        return self._analyzer(text)
+
+    def transform(self, texts: List[str]) -> csr_matrix:
+        from sklearn.preprocessing import normalize
+        indptr = [0]
+        indices, data = [], []
+        for text in texts:
+            cols, counts = np.unique(self.terms.lookup(self._analyze(text)), return_counts=True)
+            indices.append(cols)
+            # dtype wie X (float32 nach der Kompaktierung), sonst konvertiert scipy X bei jeder Query
+            data.append(counts.astype(self.idf_.dtype) * self.idf_[cols])
+            indptr.append(indptr[-1] + cols.shape[0])
+        X = csr_matrix(
+            (np.concatenate(data) if data else np.empty(0, dtype=self.idf_.dtype),
+             np.concatenate(indices) if indices else np.empty(0, dtype=np.int64), indptr),
+            shape=(len(texts), len(self.terms)),
+        )
+        return normalize(X)
+
+
+# BM25: Wort-Tokens statt char-n-Gramme, Standardparameter nach Robertson
+BM25_K1 = 1.2
+BM25_B = 0.75
+_WORD_RE = re.compile(r"[a-zäöüß0-9]{2,}")
+
+
+def _word_tokens(text: str) -> List[str]:
+    return _WORD_RE.findall((text or "").lower())
+
+
+# Invertierter Index in flachen Arrays: Postings je Term zusammenhängend (CSR-artig),
+# offsets[t]:offsets[t+1] adressiert Dokument-IDs und Termfrequenzen von Term t
+class BM25Index:
+    def __init__(self, terms: SortedTerms, offsets: np.ndarray, docs: np.ndarray, tf: np.ndarray,
+                 doc_len: np.ndarray, k1: float = BM25_K1, b: float = BM25_B):
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.tf = tf
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        n = doc_len.shape[0]
+        df = np.diff(offsets).astype(np.float64)
+        self.idf_ = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.avgdl = float(doc_len.mean()) if n else 0.0
+
+    @classmethod
+    def fit(cls, texts: Iterable[str]) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        term_parts, doc_parts, tf_parts, lengths = [], [], [], []
+        for d, text in enumerate(texts):
+            toks = _word_tokens(text)
+            lengths.append(len(toks))
+            ids = np.fromiter((vocab.setdefault(t, len(vocab)) for t in toks), dtype=np.int64, count=len(toks))
+            uniq, counts = np.unique(ids, return_counts=True)
+            term_parts.append(uniq)
+            doc_parts.append(np.full(uniq.shape[0], d, dtype=np.int32))
+            tf_parts.append(counts)
+        # Terme alphabetisch nummerieren, dann Postings nach Term gruppieren (Dokumente bleiben sortiert)
+        terms = sorted(vocab)
+        remap = np.empty(len(vocab), dtype=np.int64)
+        remap[[vocab[t] for t in terms]] = np.arange(len(terms))
+        term_ids = remap[np.concatenate(term_parts)] if term_parts else np.empty(0, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+        docs = np.concatenate(doc_parts)[order] if doc_parts else np.empty(0, dtype=np.int32)
+        tf = np.concatenate(tf_parts)[order].astype(np.float32) if tf_parts else np.empty(0, dtype=np.float32)
+        return cls(SortedTerms.from_list(terms), offsets, docs, tf, np.array(lengths, dtype=np.float32))
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "BM25Index":
+        return cls(_sorted_terms(arrays, "bm25_vocab"), arrays["bm25_offsets"], arrays["bm25_docs"],
+                   arrays["bm25_tf"], arrays["bm25_doc_len"])
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            **self.terms.arrays("bm25_vocab"),
+            "bm25_offsets": self.offsets,
+            "bm25_docs": self.docs,
+            "bm25_tf": self.tf,
+            "bm25_doc_len": self.doc_len,
+        }
+
+    # Query -> bekannte Term-IDs (ohne Duplikate)
+    def transform(self, texts: List[str]) -> List[np.ndarray]:
+        out = []
+        for text in texts:
+            out.append(np.unique(self.terms.lookup(_word_tokens(text))))
+        return out
+
+    # Nur die Postings der Query-Terme werden angefasst; übrige Dokumente bleiben 0
+    def scores(self, term_ids: np.ndarray, out: np.ndarray) -> np.ndarray:
+        out[:] = 0.0
+        if not self.avgdl:
+            return out
+        for t in term_ids:
+            lo, hi = self.offsets[t], self.offsets[t + 1]
+            docs = self.docs[lo:hi]
+            tf = self.tf[lo:hi]
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[docs] / self.avgdl)
+            out[docs] += self.idf_[t] * tf * (self.k1 + 1.0) / (tf + norm)
+        return out
+
+
+# Einträge im Query-Cache (Vektoren und Trefferlisten je separat)
+QUERY_CACHE_SIZE = 512
+
+
+# Begrenzter LRU-Cache mit Treffer-/Fehlgriff-Zählern (threadsicher, Streamlit-Sessions teilen ihn)
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[object, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+def _normalize_query(q: str) -> str:
+    return " ".join((q or "").lower().split())
+
+
+# Top-k per Teilauswahl (argpartition) statt vollständiger Sortierung
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+# Seitentexte als UTF-8-Blob mit Offset-Tabelle; Zugriff per Zeile oder (Datei, Seite) in O(1)
+class PageStore:
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, meta: List[Tuple[str, int]]):
+        self.blob = blob
+        self.offsets = offsets
+        self._rows = {key: i for i, key in enumerate(meta)}
+
+    @classmethod
+    def from_texts(cls, texts: List[str], meta: List[Tuple[str, int]]) -> "PageStore":
+        blob, offsets = pack_strings(texts)
+        return cls(blob, offsets, meta)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.text(row)
+
+    def text(self, row: int) -> str:
+        return self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    def row(self, file: str, page: int) -> Optional[int]:
+        return self._rows.get((file, page))
+
+    def get(self, file: str, page: int) -> str:
+        row = self._rows.get((file, page))
+        return "" if row is None else self.text(row)
+
+
+# Schlagwort-Positionen je Seite, beim Indexaufbau berechnet (CSR-artig wie die Texte):
+# offsets[p]:offsets[p+1] adressiert Term-IDs und Zeichen-Offsets der Seite p
+class TermPositions:
+    def __init__(self, terms: SortedTerms, offsets: np.ndarray, term_ids: np.ndarray, chars: np.ndarray):
+        self.terms = terms
+        self.offsets = offsets
+        self.term_ids = term_ids
+        self.chars = chars
+        # Schlagwort -> passende Term-IDs (pro Query einmal statt pro Seite)
+        self._matches = LRUCache(QUERY_CACHE_SIZE)
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> "TermPositions":
+        vocab: Dict[str, int] = {}
+        ids: List[int] = []
+        chars: List[int] = []
+        offsets = [0]
+        for txt in texts:
+            # Offsets im Originaltext; kleingeschrieben wird nur der Term
+            for m in _KEYWORD_RE.finditer(txt):
+                ids.append(vocab.setdefault(m.group().lower(), len(vocab)))
+                chars.append(m.start())
+            offsets.append(len(ids))
+        # Terme sortieren, damit Präfix-Suchen per Binärsuche gehen
+        terms = sorted(vocab)
+        remap = np.empty(len(vocab), dtype=np.int32)
+        remap[[vocab[t] for t in terms]] = np.arange(len(terms), dtype=np.int32)
+        return cls(SortedTerms.from_list(terms), np.array(offsets, dtype=np.int64),
+                   remap[np.array(ids, dtype=np.int64)] if ids else np.empty(0, dtype=np.int32),
+                   np.array(chars, dtype=np.int32))
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "TermPositions":
+        return cls(_sorted_terms(arrays, "pos_term"), arrays["pos_offsets"], arrays["pos_term_ids"], arrays["pos_chars"])
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            **self.terms.arrays("pos_term"),
+            "pos_offsets": self.offsets,
+            "pos_term_ids": self.term_ids,
+            "pos_chars": self.chars,
+        }
+
+    # Schlagwort -> IDs der Terme, die es enthalten: wie der frühere Teilstring-Test auf dem
+    # Seitentext, also auch Wortteile ("schulung" in "sicherheitsschulung")
+    def _matching_terms(self, keyword: str) -> np.ndarray:
+        ids = self._matches.get(keyword)
+        if ids is None:
+            ids = self.terms.containing(keyword)
+            self._matches.put(keyword, ids)
+        return ids
+
+    # Treffer auf Seite p als (Zeichen-Offset, Schlagwort-Index), nach Offset sortiert.
+    # Der Offset ist der Anfang des Worts, das das Schlagwort enthält.
+    def hits(self, page_row: int, keywords: List[str]) -> List[Tuple[int, int]]:
+        lo, hi = self.offsets[page_row], self.offsets[page_row + 1]
+        if hi == lo or not keywords:
+            return []
+        ids = self.term_ids[lo:hi]
+        chars = self.chars[lo:hi]
+        out: List[Tuple[int, int]] = []
+        for k, kw in enumerate(keywords):
+            match = self._matching_terms(kw)
+            if match.shape[0]:
+                out.extend((int(c), k) for c in chars[np.isin(ids, match)])
+        out.sort()
+        return out
+
+
+# Dichtestes Fenster: meiste verschiedene Schlagworte, dann meiste Treffer
+def _densest_window(hits: List[Tuple[int, int]], width: int) -> Tuple[int, int]:
+    best = (0, 0, 0, 0)  # (verschiedene, Treffer, erster Offset, letzter Offset)
+    counts: Dict[int, int] = {}
+    i = 0
+    for j, (pos, kw) in enumerate(hits):
+        counts[kw] = counts.get(kw, 0) + 1
+        while pos - hits[i][0] > width:
+            old = hits[i][1]
+            counts[old] -= 1
+            if not counts[old]:
+                del counts[old]
+            i += 1
+        cand = (len(counts), j - i + 1, hits[i][0], pos)
+        if cand[:2] > best[:2]:
+            best = cand
+    return best[2], best[3]
+
+
+# Auszug um die dichteste Trefferstelle, an Wortgrenzen ausgerichtet
+def _keyword_window(txt: str, hits: List[Tuple[int, int]], width: int = SNIPPET_WINDOW_CHARS) -> str:
+    if len(txt) <= width:
+        return txt
+    first, last = _densest_window(hits, width)
+    start = max(0, first - (width - (last - first)) // 2)
+    start = min(start, len(txt) - width)
+    if start > 0 and txt[start - 1] != " ":
+        # nach rechts an die nächste Wortgrenze: das Fenster reicht dann weiter über last hinaus
+        sp = txt.find(" ", start, first)
+        start = sp + 1 if sp >= 0 else first
+    end = min(len(txt), start + width)
+    if end < len(txt):
+        sp = txt.rfind(" ", start, end)
+        end = sp if sp > last else end
+    # last kann bis zu width hinter first liegen: das Wort dort nie abschneiden
+    word_end = txt.find(" ", last)
+    end = max(end, len(txt) if word_end < 0 else word_end)
+    return txt[start:end]
+
+
 # Hauptklasse für Richtlinien-Suche
 class PolicySearch:
-    def __init__(self, policy_dir: str):
+    def __init__(self, policy_dir: str, workers: int = 1,
+                 chunk_chars: Optional[int] = None, chunk_overlap: int = CHUNK_OVERLAP,
+                 engine: str = "tfidf", lsa_components: int = LSA_COMPONENTS,
+                 lsa_max_features: int = LSA_MAX_FEATURES,
+                 rerank: bool = True, index_path: Optional[str] = None,
+                 query_cache_size: int = QUERY_CACHE_SIZE, files: Optional[List[str]] = None,
+                 progress: Optional[ProgressFn] = None, read_only: bool = False,
+                 compact: bool = True, prune_min_df: int = PRUNE_MIN_DF,
+                 prune_min_weight: float = PRUNE_MIN_WEIGHT, dedup: bool = False,
+                 dedup_threshold: float = DEDUP_THRESHOLD):
+        if engine not in ENGINES:
+            raise ValueError(f"Unbekannte Engine: {engine} (verfügbar: {', '.join(ENGINES)})")
         self.policy_dir = policy_dir
-        self.docs: List[str] = []
+        self.workers = workers
+        self.progress = progress
+        # Optionen für next_generation (gleiche Einstellungen, anderer Speicherort)
+        self._options = dict(
+            workers=workers, chunk_chars=chunk_chars, chunk_overlap=chunk_overlap, engine=engine,
+            lsa_components=lsa_components, lsa_max_features=lsa_max_features, rerank=rerank, query_cache_size=query_cache_size,
+            files=files, read_only=read_only, compact=compact, prune_min_df=prune_min_df,
+            prune_min_weight=prune_min_weight, dedup=dedup, dedup_threshold=dedup_threshold,
+        )
+        self.index_path = index_path or os.path.join(policy_dir, INDEX_FILE)
+        # Optional nur diese PDFs aus policy_dir indexieren
+        self.files = set(files) if files is not None else None
+        # Nur anhängen: vorhandenen Index per mmap laden, nie selbst bauen (mehrere Server-Prozesse)
+        self.read_only = read_only
+        self.engine = engine
+        # LSA: dichte Projektion (float32); rerank=True bewertet die Kandidaten exakt nach und
+        # behält dafür X, lsa_cols = Spalten von X, über die projiziert wird. Ohne Re-Ranking
+        # enthält das Vokabular nur noch die projizierten Features und X wird nicht gespeichert
+        self.lsa_components = lsa_components
+        self.lsa_max_features = lsa_max_features
+        self.rerank = rerank
+        self.lsa_docs = None
+        self.lsa_terms = None
+        self.lsa_cols = None
+        # Kompaktierung der Dokument-Matrix (nicht für BM25)
+        self.compact = compact
+        self.prune_min_df = prune_min_df
+        self.prune_min_weight = prune_min_weight
+        # Near-Duplicates (optional, kostet einen MinHash-Durchlauf pro Aufbau):
+        # dup_of[Seite] = Vertreter-Seite oder -1; nur Vertreter werden indexiert
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
+        self.dup_of = np.empty(0, dtype=np.int32)
+        self._alt_map: Optional[Dict[int, List[Tuple[str, int]]]] = None
+        # None = eine Seite pro Dokument, sonst überlappende Fenster dieser Größe
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
         self.meta: List[Tuple[str, int]] = []
+        # Index-Zeile -> Seite (Zeile in meta/pages), Zeichen-Offset und Länge des Fensters
+        self.row_page = np.empty(0, dtype=np.int32)
+        self.row_offset = np.empty(0, dtype=np.int32)
+        self.row_length = np.empty(0, dtype=np.int32)
         self.vectorizer = None
         self.X = None
+        self.pages = PageStore.from_texts([], [])
+        self.positions = TermPositions.from_texts([])
+        self.fingerprints: Dict[str, Dict[str, object]] = {}
+        # Einlesedauer pro Datei in Sekunden (nur nach einem Neuaufbau gefüllt)
+        self.ingest_timings: Dict[str, float] = {}
+        # Vokabular + IDF aus dem Index; der Vectorizer wird erst bei der ersten Suche erzeugt
+        self._vocab = None
+        # Wird bei jedem Laden/Aufbau erhöht und ist Teil der Cache-Schlüssel
+        self.index_version = 0
+        self._vector_cache = LRUCache(query_cache_size)
+        self._hit_cache = LRUCache(query_cache_size)
+        self._index_config = None
+        self._load_error: Optional[str] = None
         self._load_or_build()
 
-    def _cache_paths(self):
-        return {k: os.path.join(self.policy_dir, v) for k, v in CACHE_FILES.items()}
+    def _load_index(self) -> bool:
+        path = self.index_path
+        self._load_error = None
+        if not os.path.exists(path):
+            return False
+        try:
+            # Nur-Lese-Modus: Artefakt aus dem Build-Schritt, Prüfsumme vor dem Anhängen prüfen
+            meta, arrays = read_index(path, verify=self.read_only)
+            files = meta["files"]
+            self.meta = [
+                (files[f], p)
+                for f, p in zip(arrays["meta_file"].tolist(), arrays["meta_page"].tolist())
+            ]
+            self.pages = PageStore(arrays["text_blob"], arrays["text_offsets"], self.meta)
+            self.positions = TermPositions.from_arrays(arrays)
+            self.fingerprints = meta["fingerprints"]
+            self.dup_of = arrays.get("dup_of", np.full(len(self.meta), -1, dtype=np.int32))
+            self._alt_map = None
+            self.X = None
+            if "X_data" in arrays:
+                self.X = csr_matrix(
+                    (arrays["X_data"], arrays["X_indices"], arrays["X_indptr"]),
+                    shape=tuple(meta["shape"]),
+                )
+            self.row_page = arrays["row_page"]
+            self.row_offset = arrays["row_offset"]
+            self.row_length = arrays["row_length"]
+            self.lsa_docs = arrays.get("lsa_docs")
+            self.lsa_terms = arrays.get("lsa_terms")
+            self.lsa_cols = arrays.get("lsa_cols")
+            self._index_config = meta.get("config")
+            self.vectorizer = None
+            if "bm25_offsets" in arrays:
+                self._vocab = {name: a for name, a in arrays.items() if name.startswith("bm25_")}
+            else:
+                # Hashing-Index ohne Vokabular; fehlt es sonst, schlägt das Laden fehl und es wird neu gebaut
+                terms = None if meta["engine"] == "hashing" else _sorted_terms(arrays, "vocab")
+                self._vocab = (terms, arrays["idf"])
+            self._new_index_version()
+            return True
+        except Exception as e:
+            self._load_error = str(e)
+            return False
+
+    def _save_index(self):
+        files = sorted(self.fingerprints)
+        file_ids = {fn: i for i, fn in enumerate(files)}
+        arrays = {
+            "meta_file": np.array([file_ids[fn] for fn, _ in self.meta], dtype=np.int32),
+            "meta_page": np.array([p for _, p in self.meta], dtype=np.int32),
+            "text_blob": self.pages.blob,
+            "text_offsets": self.pages.offsets,
+            "row_page": self.row_page,
+            "row_offset": self.row_offset,
+            "row_length": self.row_length,
+            "dup_of": self.dup_of,
+        }
+        arrays.update(self.positions.arrays())
+        if self.engine == "bm25":
+            arrays.update(self.vectorizer.arrays())
+        else:
+            if self.X is not None:
+                arrays["X_data"] = self.X.data
+                arrays["X_indices"] = self.X.indices
+                arrays["X_indptr"] = self.X.indptr
+            arrays["idf"] = self.vectorizer.idf_
+        if self.engine in ("tfidf", "lsa"):
+            arrays.update(self.vectorizer.terms.arrays("vocab"))
+        if self.engine == "lsa":
+            arrays["lsa_docs"] = self.lsa_docs
+            arrays["lsa_terms"] = self.lsa_terms
+            if self.lsa_cols is not None:
+                arrays["lsa_cols"] = self.lsa_cols
+        meta = {
+            "engine": self.engine,
+            "config": self._config(),
+            "shape": list(self.X.shape) if self.X is not None else [len(self.row_page), 0],
+            "files": files,
+            "fingerprints": self.fingerprints,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        write_index(self.index_path, arrays, meta)
+        self._remove_legacy_cache()
+
+    def _remove_legacy_cache(self):
+        for fn in LEGACY_CACHE_FILES:
+            p = os.path.join(self.policy_dir, fn)
+            if os.path.exists(p):
+                os.remove(p)
+
+    def _clear_index(self):
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        self._remove_legacy_cache()
+
+    def _new_index_version(self):
+        self.index_version += 1
+        self._vector_cache.clear()
+        self._hit_cache.clear()
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {"vectors": self._vector_cache.stats(), "hits": self._hit_cache.stats()}
+
+    def _query_vectorizer(self):
+        if self.vectorizer is None and self._vocab is not None:
+            if self.engine == "bm25":
+                self.vectorizer = BM25Index.from_arrays(self._vocab)
+                return self.vectorizer
+            terms, idf = self._vocab
+            if self.engine == "hashing":
+                self.vectorizer = HashingEncoder(idf, n_features=idf.shape[0])
+                return self.vectorizer
+            self.vectorizer = VocabEncoder(terms, idf)
+        return self.vectorizer
+
+    def _config(self) -> Dict[str, object]:
+        cfg = {"engine": self.engine, "chunk_chars": self.chunk_chars, "chunk_overlap": self.chunk_overlap}
+        if self.engine == "lsa":
+            cfg["lsa_components"] = self.lsa_components
+            cfg["lsa_max_features"] = self.lsa_max_features
+            cfg["rerank"] = self.rerank
+        cfg["dedup"] = self.dedup_threshold if self.dedup else None
+        if self.engine != "bm25":
+            cfg["compact"] = self.compact
+            if self.compact:
+                cfg["prune_min_df"] = self.prune_min_df
+                cfg["prune_min_weight"] = self.prune_min_weight
+        return cfg
 
     def _load_or_build(self):
+        if self.read_only:
+            if not self._load_index():
+                reason = f": {self._load_error}" if self._load_error else ""
+                raise FileNotFoundError(f"Kein lesbarer Policy-Index unter {self.index_path} (Nur-Lese-Modus){reason}")
+            # Einstellungen des veröffentlichten Index übernehmen statt neu zu indexieren
+            cfg = self._index_config or {}
+            self.engine = cfg.get("engine", self.engine)
+            self.chunk_chars = cfg.get("chunk_chars", self.chunk_chars)
+            self.chunk_overlap = cfg.get("chunk_overlap", self.chunk_overlap)
+            self.lsa_components = cfg.get("lsa_components", self.lsa_components)
+            self.lsa_max_features = cfg.get("lsa_max_features", self.lsa_max_features)
+            self.rerank = cfg.get("rerank", self.rerank)
+            return
         os.makedirs(self.policy_dir, exist_ok=True)
-        paths = self._cache_paths()
-        if all(os.path.exists(p) for p in paths.values()):
-            try:
-                with open(paths["index"], "rb") as f: self.X = pickle.load(f)
-                with open(paths["vectorizer"], "rb") as f: self.vectorizer = pickle.load(f)
-                with open(paths["meta"], "rb") as f: self.meta = pickle.load(f)
-                with open(paths["docs"], "rb") as f: self.docs = pickle.load(f)
-                return
-            except Exception as e:
-                pass
-
-        self.docs, self.meta = build_corpus(self.policy_dir)
-        if not self.docs:
+        if self._load_index():
+            # Anderer Modus als gespeichert: Seitentexte wiederverwenden, nur neu indexieren
+            if self._index_config != self._config():
+                self._build(reuse=True)
             return
+        self._build(reuse=False)
 
-        self.vectorizer = TfidfVectorizer(
-            analyzer="char_wb",
-            ngram_range=(3, 5),
-            max_df=0.95,
-            min_df=1,
-            lowercase=True
-        )
-        self.X = self.vectorizer.fit_transform(self.docs)
+    # Index-Zeilen erzeugen (ganze Seiten oder überlappende Fenster); füllt row_* am Ende
+    def _iter_index_rows(self, docs: Iterable[str]) -> Iterator[str]:
+        row_page = []; row_offset = []; row_length = []
+        for p, txt in enumerate(docs):
+            if self.dup_of.shape[0] > p and self.dup_of[p] >= 0:
+                # Near-Duplicate: wird über die Vertreter-Seite gefunden
+                continue
+            if self.chunk_chars:
+                spans = _chunk_spans(txt, self.chunk_chars, self.chunk_overlap)
+            else:
+                spans = [(0, len(txt))]
+            for off, ln in spans:
+                row_page.append(p); row_offset.append(off); row_length.append(ln)
+                yield txt[off:off + ln]
+        self.row_page = np.array(row_page, dtype=np.int32)
+        self.row_offset = np.array(row_offset, dtype=np.int32)
+        self.row_length = np.array(row_length, dtype=np.int32)
+
+    # Datei -> (erste, letzte + 1) Zeile im PageStore
+    def _file_rows(self) -> Dict[str, Tuple[int, int]]:
+        rows: Dict[str, Tuple[int, int]] = {}
+        for i, (fn, _) in enumerate(self.meta):
+            lo = rows.get(fn, (i, i))[0]
+            rows[fn] = (lo, i + 1)
+        return rows
+
+    # Index aufbauen; mit reuse=True nur neue/geänderte PDFs neu einlesen.
+    # Seitentexte gehen dateiweise in den UTF-8-Speicher (unveränderte PDFs als Bytes aus dem
+    # alten Index); danach lesen alle Schritte aus dem PageStore statt aus einer Liste von Strings.
+    def _build(self, reuse: bool):
+        old_rows = self._file_rows() if reuse else {}
+        old_pages = self.pages
+        old_fps = self.fingerprints if reuse else {}
+
+        fingerprints: Dict[str, Dict[str, object]] = {}
+        stale: List[str] = []
+        for fn in self._policy_files():
+            path = os.path.join(self.policy_dir, fn)
+            same, fp = _unchanged(old_fps.get(fn), path)
+            fingerprints[fn] = fp
+            if not (same and fn in old_rows):
+                stale.append(fn)
+
+        # Inhalt, Dateiliste und Einstellungen unverändert (z. B. nur Zeitstempel neu): Index
+        # übernehmen und nur die Fingerabdrücke speichern, statt alles neu zu berechnen
+        if reuse and old_rows and not stale and set(fingerprints) == set(old_rows) \
+                and self._index_config == self._config():
+            self.fingerprints = fingerprints
+            self.ingest_timings = {}
+            self._query_vectorizer()
+            self._save_index()
+            self._load_index()
+            return
+
+        self.ingest_timings = {}
+        fresh = iter_corpus(self.policy_dir, workers=self.workers, timings=self.ingest_timings,
+                            files=stale, progress=self.progress)
+        blob = bytearray()
+        offsets = [np.zeros(1, dtype=np.int64)]
+        meta: List[Tuple[str, int]] = []
+        for fn in sorted(fingerprints):
+            if fn in old_rows and fn not in stale:
+                lo, hi = old_rows[fn]
+                start = len(blob)
+                blob += old_pages.blob[old_pages.offsets[lo]:old_pages.offsets[hi]].tobytes()
+                offsets.append(old_pages.offsets[lo + 1:hi + 1] - old_pages.offsets[lo] + start)
+                n = hi - lo
+            else:
+                # iter_corpus liefert die neu einzulesenden PDFs in derselben sortierten Reihenfolge
+                _, pages = next(fresh)
+                ends = []
+                for txt in pages:
+                    blob += txt.encode("utf-8")
+                    ends.append(len(blob))
+                offsets.append(np.array(ends, dtype=np.int64))
+                n = len(pages)
+            meta.extend((fn, i + 1) for i in range(n))
+        self.meta, self.fingerprints = meta, fingerprints
+        self.pages = PageStore(np.frombuffer(blob, dtype=np.uint8), np.concatenate(offsets), meta)
+        del old_pages
+        self.positions = TermPositions.from_texts(self.pages)
+        if self.dedup:
+            self.dup_of = _near_duplicates(self.pages, self.dedup_threshold)
+        else:
+            self.dup_of = np.full(len(meta), -1, dtype=np.int32)
+        self._alt_map = None
+        self._vocab = None
+        self._new_index_version()
+
+        if not meta:
+            self.vectorizer = None
+            self.X = None
+            self._clear_index()
+            return
+
+        if self.progress is not None:
+            self.progress(len(stale), len(stale), "Index wird berechnet")
+        if self.engine == "bm25":
+            # Invertierter Index statt Dokument-Matrix; X bleibt leer
+            self.vectorizer = BM25Index.fit(self._iter_index_rows(self.pages))
+            self.X = None
+        elif self.engine == "hashing":
+            # Seiten zweimal batchweise aus dem PageStore durch den Hasher streamen, kein Vokabular
+            self.vectorizer = HashingEncoder()
+            self.X = self.vectorizer.fit_transform_batches(
+                lambda: _batched(self._iter_index_rows(self.pages), HASHING_BATCH)
+            )
+        else:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            vec = TfidfVectorizer(**VECTORIZER_PARAMS)
+            self.X = vec.fit_transform(list(self._iter_index_rows(self.pages)))
+            # sklearn nummeriert das Vokabular alphabetisch: Position im Array = Spalte in X
+            terms = sorted(vec.vocabulary_, key=vec.vocabulary_.get)
+            self.vectorizer = VocabEncoder(SortedTerms.from_list(terms), vec.idf_)
+        if self.engine != "bm25" and self.compact:
+            self._compact()
+        if self.engine == "lsa":
+            self._fit_lsa()
+        self._save_index()
+        # Frisch gebaute Arrays verwerfen und wie jeder andere Prozess per mmap anhängen
+        self._load_index()
+
+    # float32, Features unter den Schwellen entfernen, Zeilen ohne Features verwerfen
+    def _compact(self):
+        from sklearn.preprocessing import normalize
+        X = self.X.astype(np.float32)
+        df = np.bincount(X.indices, minlength=X.shape[1])
+        peak = X.max(axis=0).toarray().ravel() if X.shape[0] else np.zeros(X.shape[1], dtype=np.float32)
+        keep = (df >= self.prune_min_df) & (peak >= self.prune_min_weight)
+        idf = np.asarray(self.vectorizer.idf_, dtype=np.float32)
+        terms = getattr(self.vectorizer, "terms", None)
+        if not keep.all():
+            if self.engine == "hashing":
+                # Hash-Raum bleibt fest: entfernte Features bekommen IDF 0 und fallen aus X heraus
+                idf[~keep] = 0
+                X.data[~keep[X.indices]] = 0
+                X.eliminate_zeros()
+            else:
+                cols = np.flatnonzero(keep)
+                X = X[:, cols]
+                terms, idf = terms.take(cols), idf[cols]
+            X = normalize(X)
+        if self.engine == "hashing":
+            self.vectorizer = HashingEncoder(idf, n_features=idf.shape[0])
+        else:
+            self.vectorizer = VocabEncoder(terms, idf)
+        # Leere Zeilen (ausgeblendete Seiten, komplett beschnittene Fenster) aus dem Index nehmen;
+        # meta/pages bleiben vollständig, row_page verweist weiter auf die richtige Seite
+        rows = np.flatnonzero(np.diff(X.indptr) > 0)
+        if rows.shape[0] < X.shape[0]:
+            X = X[rows]
+            self.row_page = self.row_page[rows]
+            self.row_offset = self.row_offset[rows]
+            self.row_length = self.row_length[rows]
+        self.X = X.tocsr()
+
+    # Dichte LSA-Projektion: Dokumente (n x d) und Term-Gewichte (lsa_max_features x d), float32
+    def _fit_lsa(self):
+        from sklearn.decomposition import TruncatedSVD
+        df = np.bincount(self.X.indices, minlength=self.X.shape[1])
+        cols = np.sort(np.argsort(-df, kind="stable")[:self.lsa_max_features]).astype(np.int32)
+        X = self.X[:, cols]
+        n_comp = max(1, min(self.lsa_components, min(X.shape) - 1))
+        svd = TruncatedSVD(n_components=n_comp, random_state=0)
+        docs = svd.fit_transform(X).astype(np.float32)
+        norms = np.linalg.norm(docs, axis=1, keepdims=True)
+        self.lsa_docs = docs / np.where(norms == 0, 1, norms)
+        self.lsa_terms = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+        if self.rerank:
+            self.lsa_cols = cols
+        else:
+            # X wird nur für das Re-Ranking gebraucht; die Query direkt im LSA-Vokabular kodieren
+            self.vectorizer = VocabEncoder(self.vectorizer.terms.take(cols), self.vectorizer.idf_[cols])
+            self.lsa_cols = None
+            self.X = None
+
+    def _policy_files(self) -> List[str]:
+        files = _list_pdfs(self.policy_dir)
+        if self.files is not None:
+            files = [fn for fn in files if fn in self.files]
+        return files
 
-        with open(paths["index"], "wb") as f: pickle.dump(self.X, f)
-        with open(paths["vectorizer"], "wb") as f: pickle.dump(self.vectorizer, f)
-        with open(paths["meta"], "wb") as f: pickle.dump(self.meta, f)
-        with open(paths["docs"], "wb") as f: pickle.dump(self.docs, f)
+    # True, wenn PDFs hinzugekommen, entfernt oder inhaltlich geändert wurden
+    def is_stale(self) -> bool:
+        files = self._policy_files()
+        if set(files) != set(self.fingerprints):
+            return True
+        return any(
+            not _unchanged(self.fingerprints[fn], os.path.join(self.policy_dir, fn))[0]
+            for fn in files
+        )
 
+    # Inkrementeller Neuaufbau: unveränderte PDFs werden aus dem Index übernommen
     def rebuild(self):
-        paths = self._cache_paths()
-        for p in paths.values():
-            if os.path.exists(p):
-                os.remove(p)
-        self._load_or_build()
+        if self.read_only:
+            raise RuntimeError("Index ist im Nur-Lese-Modus geöffnet.")
+        if not self.meta:
+            self._load_index()
+        self._build(reuse=True)
 
+    # Neue Index-Generation daneben aufbauen und atomar an index_path tauschen.
+    # Diese Instanz bleibt unverändert nutzbar (laufende Suchen behalten die alte Generation).
+    def next_generation(self, progress: Optional[ProgressFn] = None) -> "PolicySearch":
+        if self.read_only:
+            # Nur-Lese-Prozesse bauen nicht selbst, sie hängen sich an den aktuell veröffentlichten Index
+            return PolicySearch(self.policy_dir, index_path=self.index_path, **self._options)
+        side = self.index_path + ".next"
+        if os.path.exists(self.index_path):
+            shutil.copyfile(self.index_path, side)
+        nxt = PolicySearch(self.policy_dir, index_path=side, progress=progress, **self._options)
+        if nxt.is_stale():
+            nxt.rebuild()
+        if os.path.exists(side):
+            os.replace(side, self.index_path)
+        elif os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        nxt.index_path = self.index_path
+        nxt.progress = None
+        return nxt
+
+    # Seitentext aus dem gespeicherten Korpus (kein PDF-Parsing zur Suchzeit)
     def _page_text(self, file: str, page: int) -> str:
-        path = os.path.join(self.policy_dir, file)
-        try:
-            reader = PdfReader(path)
-            idx = max(0, min(len(reader.pages)-1, page-1))
-            raw = reader.pages[idx].extract_text() or ""
-            return _normalize_text(raw)
-        except Exception:
-            return ""
+        return self.pages.get(file, page)
 
     def _best_matching_page_with_snippet(self, file: str, page: int, query: str) -> Tuple[int, str]:
         kws = _keywords_from_query(query)
@@ -136,38 +1224,329 @@ class PolicySearch:
         candidates.append(page+1)
 
         for p in candidates:
-            txt = self._page_text(file, p)
+            row = self.pages.row(file, p)
+            if row is None:
+                continue
+            txt = self.pages.text(row)
             if not txt:
                 continue
-            if not kws or any(k in txt.lower() for k in kws):
-                snippet = txt[:SNIPPET_MAX_CHARS]
-                return p, snippet
+            if not kws:
+                return p, txt[:SNIPPET_MAX_CHARS]
+            hits = self.positions.hits(row, kws)
+            if hits:
+                return p, _keyword_window(txt, hits)
 
         txt = self._page_text(file, page)
         return page, txt[:SNIPPET_MAX_CHARS] if txt else ""
 
-    # Suche ausführen
-    def search(self, query: str, k: int = 7) -> List[PolicyHit]:
-        if self.vectorizer is None or self.X is None or self.X.shape[0] == 0:
-            return []
-        qv = self.vectorizer.transform([query])
-        sims = linear_kernel(qv, self.X).ravel()
-        idxs = sims.argsort()[::-1][:k]
-
+    # Treffer mit Auszug für die Zeilen idxs (scores in derselben Reihenfolge)
+    def _hits_for(self, idxs: np.ndarray, scores: np.ndarray, query: str) -> List[PolicyHit]:
         hits: List[PolicyHit] = []
-        for i in idxs:
-            if i < 0 or i >= len(self.meta):
+        for i, score in zip(idxs, scores):
+            if i < 0 or i >= len(self.row_page):
                 continue
-            file, page = self.meta[i]
-            ver_page, snippet = self._best_matching_page_with_snippet(file, page, query)
+            p = int(self.row_page[i])
+            file, page = self.meta[p]
+            if self.chunk_chars:
+                # Chunk-Modus: das Fenster selbst ist der Auszug, keine Nachbarseiten-Suche
+                off, ln = int(self.row_offset[i]), int(self.row_length[i])
+                ver_page, snippet = page, self.pages.text(p)[off:off + ln]
+            else:
+                off = 0
+                ver_page, snippet = self._best_matching_page_with_snippet(file, page, query)
             hits.append(PolicyHit(
                 file=file,
                 page=ver_page,
-                score=float(sims[i]),
+                score=float(score),
                 snippet=_normalize_text(snippet),
-                orig_page=page
+                orig_page=page,
+                char_offset=off,
+                alternates=self._alternates(p),
             ))
         return hits
-    
+
+    def _alternates(self, page_row: int) -> List[Tuple[str, int]]:
+        if self._alt_map is None:
+            alt: Dict[int, List[Tuple[str, int]]] = {}
+            for row in np.flatnonzero(self.dup_of >= 0).tolist():
+                alt.setdefault(int(self.dup_of[row]), []).append(self.meta[row])
+            self._alt_map = alt
+        return list(self._alt_map.get(page_row, []))
+
+    # Top-k Zeilen; im Chunk-Modus ohne überlappende Fenster derselben Seite
+    def _select_rows(self, sims: np.ndarray, k: int) -> np.ndarray:
+        if not self.chunk_chars:
+            return _top_k(sims, k)
+        picked: List[int] = []
+        for i in _top_k(sims, k * 4):
+            p, off = self.row_page[i], self.row_offset[i]
+            end = off + self.row_length[i]
+            if any(self.row_page[j] == p and off < self.row_offset[j] + self.row_length[j]
+                   and self.row_offset[j] < end for j in picked):
+                continue
+            picked.append(int(i))
+            if len(picked) == k:
+                break
+        return np.array(picked, dtype=np.int64)
+
+    # Suche ausführen
+    def search(self, query: str, k: int = 7) -> List[PolicyHit]:
+        return self.search_many([query], k=k)[0]
+
+    # Mehrere Queries mit einem einzigen Sparse-Produkt beantworten
+    def search_many(self, queries: List[str], k: int = 7) -> List[List[PolicyHit]]:
+        if len(self.row_page) == 0 or self._query_vectorizer() is None:
+            return [[] for _ in queries]
+        if not queries:
+            return []
+
+        version = self.index_version
+        keys = [_normalize_query(q) for q in queries]
+        results: List[Optional[List[PolicyHit]]] = [self._hit_cache.get((key, k, version)) for key in keys]
+        todo = [r for r, res in enumerate(results) if res is None]
+        if todo:
+            for r, (rows, scores) in zip(todo, self._ranked_many([keys[r] for r in todo], k)):
+                results[r] = self._hits_for(rows, scores, queries[r])
+                self._hit_cache.put((keys[r], k, version), results[r])
+        return [list(res) for res in results]
+
+    # Top-k Zeilen und ihre Scores je normalisierter Query, noch ohne Auszüge
+    def _ranked_many(self, keys: List[str], k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        if len(self.row_page) == 0 or self._query_vectorizer() is None:
+            empty = np.empty(0, dtype=np.int64)
+            return [(empty, np.empty(0, dtype=np.float64)) for _ in keys]
+        ranked = []
+        for sims in self._iter_scores(self._query_vectors(keys, self.index_version), k):
+            rows = self._select_rows(sims, k)
+            # sims wird für die nächste Query wiederverwendet: Scores kopieren
+            ranked.append((rows, sims[rows]))
+        return ranked
+
+    # Ähnlichkeiten je Query als dichter Vektor über alle Index-Zeilen
+    def _iter_scores(self, Q, k: int):
+        n = len(self.row_page)
+        if self.engine == "bm25":
+            sims = np.zeros(n, dtype=np.float64)
+            for term_ids in Q:
+                yield self.vectorizer.scores(term_ids, sims)
+            return
+        if self.engine == "lsa":
+            # Query in float32 casten, sonst wird die Term-Matrix bei jedem Aufruf hochkonvertiert
+            Qd = Q if self.lsa_cols is None else Q[:, self.lsa_cols]
+            D = np.asarray(Qd.astype(np.float32) @ self.lsa_terms)
+            norms = np.linalg.norm(D, axis=1, keepdims=True)
+            D /= np.where(norms == 0, 1, norms)
+            S = D @ self.lsa_docs.T
+            for j in range(S.shape[0]):
+                sims = S[j].astype(np.float64)
+                if self.rerank and self.X is not None:
+                    # Kandidaten aus dem dichten Raum exakt mit TF-IDF nachbewerten
+                    cands = _top_k(sims, max(k * 4, RERANK_DEPTH))
+                    exact = (self.X[cands] @ Q[j].T).toarray().ravel()
+                    sims = np.zeros(n, dtype=np.float64)
+                    sims[cands] = exact
+                yield sims
+            return
+
+        # X @ Q.T statt Q @ X.T: transponiert nur die Query, nicht den ganzen Index;
+        # als CSC liegt je Query eine Spalte zusammenhängend vor
+        S = (self.X @ Q.T).tocsc()
+        sims = np.zeros(n, dtype=np.float64)
+        for j in range(S.shape[1]):
+            lo, hi = S.indptr[j], S.indptr[j + 1]
+            sims[:] = 0.0
+            sims[S.indices[lo:hi]] = S.data[lo:hi]
+            yield sims
+
+    def _query_vectors(self, keys: List[str], version: int):
+        rows = [self._vector_cache.get((key, version)) for key in keys]
+        missing = [j for j, row in enumerate(rows) if row is None]
+        if missing:
+            Q = self.vectorizer.transform([keys[j] for j in missing])
+            for pos, j in enumerate(missing):
+                rows[j] = Q[pos]
+                self._vector_cache.put((keys[j], version), rows[j])
+        if self.engine == "bm25":
+            return rows
+        return sp_vstack(rows, format="csr")
+
+    # Speicherbedarf der Index-Arrays: "shared" liegt in der mmap-Abbildung (von allen
+    # Prozessen geteilt), "private" wurde in diesem Prozess angelegt
+    def memory_report(self) -> Dict[str, int]:
+        arrays = [self.pages.blob, self.pages.offsets, self.row_page, self.row_offset, self.row_length,
+                  self.lsa_docs, self.lsa_terms, self.lsa_cols]
+        arrays += list(self.positions.arrays().values())
+        if self.X is not None:
+            arrays += [self.X.data, self.X.indices, self.X.indptr]
+        vec = self._query_vectorizer()
+        if isinstance(vec, BM25Index):
+            arrays += list(vec.arrays().values())
+        elif isinstance(vec, VocabEncoder):
+            arrays += [vec.terms.blob, vec.terms.offsets, vec.idf_]
+        report = {"shared": 0, "private": 0}
+        for a in arrays:
+            if a is not None:
+                report["shared" if is_mapped(a) else "private"] += a.nbytes
+        return report
+
     def list_files(self) -> List[str]:
         return sorted(list({fn for fn, _ in self.meta}))
+
+
+# Ein Index pro PDF; die Suche fächert parallel auf alle Shards auf und mischt nach Score.
+# Hinzufügen/Entfernen einer Policy betrifft nur deren Shard.
+class ShardedPolicySearch:
+    def __init__(self, policy_dir: str, workers: int = 1, files: Optional[List[str]] = None,
+                 shard_dir: Optional[str] = None, search_threads: Optional[int] = None, **kwargs):
+        self.policy_dir = policy_dir
+        self.workers = workers
+        self.files = set(files) if files is not None else None
+        self.shard_dir = shard_dir or os.path.join(policy_dir, SHARD_DIR)
+        self.search_threads = search_threads or min(8, os.cpu_count() or 1)
+        # Weitere Optionen (engine, chunk_chars, ...) gelten für jeden Shard
+        self.kwargs = kwargs
+        self.read_only = kwargs.get("read_only", False)
+        self.shards: Dict[str, PolicySearch] = {}
+        self.ingest_timings: Dict[str, float] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Gemischte Treffer über alle Shards; bei jeder Änderung der Shards geleert
+        self._hit_cache = LRUCache(kwargs.get("query_cache_size", QUERY_CACHE_SIZE))
+        if self.read_only:
+            self._attach()
+            return
+        os.makedirs(self.shard_dir, exist_ok=True)
+        self._sync()
+
+    def _shard_path(self, fn: str) -> str:
+        return os.path.join(self.shard_dir, fn + ".bin")
+
+    def _open_shard(self, fn: str) -> PolicySearch:
+        return PolicySearch(self.policy_dir, workers=self.workers, files=[fn],
+                            index_path=self._shard_path(fn), **self.kwargs)
+
+    # Nur-Lese-Modus: vorhandene Shards anhängen, nichts bauen oder löschen
+    def _attach(self):
+        if not os.path.isdir(self.shard_dir):
+            raise FileNotFoundError(f"Kein Shard-Verzeichnis unter {self.shard_dir} (Nur-Lese-Modus).")
+        for name in sorted(os.listdir(self.shard_dir)):
+            fn = name[:-len(".bin")]
+            if name.endswith(".bin") and (self.files is None or fn in self.files):
+                self.shards[fn] = self._open_shard(fn)
+
+    # Shards mit dem Ordnerinhalt abgleichen: neue bauen, geänderte aktualisieren, entfernte löschen
+    def _sync(self):
+        files = [fn for fn in _list_pdfs(self.policy_dir) if self.files is None or fn in self.files]
+        self.ingest_timings = {}
+
+        for fn in list(self.shards):
+            if fn not in files:
+                del self.shards[fn]
+                if os.path.exists(self._shard_path(fn)):
+                    os.remove(self._shard_path(fn))
+        if self.files is None:
+            for name in os.listdir(self.shard_dir):
+                if name.endswith(".bin") and name[:-len(".bin")] not in files:
+                    os.remove(os.path.join(self.shard_dir, name))
+
+        for fn in files:
+            shard = self.shards.get(fn)
+            if shard is None:
+                shard = self._open_shard(fn)
+                self.shards[fn] = shard
+            if shard.is_stale():
+                shard.rebuild()
+            self.ingest_timings.update(shard.ingest_timings)
+        self._hit_cache.clear()
+
+    def rebuild(self):
+        if self.read_only:
+            raise RuntimeError("Index ist im Nur-Lese-Modus geöffnet.")
+        self._sync()
+
+    # Neue Generation: geänderte/neue Shards daneben bauen, unveränderte Shard-Objekte übernehmen
+    def next_generation(self, progress: Optional[ProgressFn] = None) -> "ShardedPolicySearch":
+        if self.read_only:
+            return ShardedPolicySearch(self.policy_dir, workers=self.workers, files=self.files,
+                                       shard_dir=self.shard_dir, search_threads=self.search_threads,
+                                       **self.kwargs)
+        files = [fn for fn in _list_pdfs(self.policy_dir) if self.files is None or fn in self.files]
+        nxt = object.__new__(ShardedPolicySearch)
+        nxt.__dict__.update(self.__dict__)
+        nxt.shards = {}
+        nxt.ingest_timings = {}
+        nxt._pool = None
+        nxt._hit_cache = LRUCache(self._hit_cache.maxsize)
+        for done, fn in enumerate(files, start=1):
+            shard = self.shards.get(fn)
+            if shard is None:
+                shard = self._open_shard(fn)
+            elif shard.is_stale():
+                shard = shard.next_generation()
+            nxt.shards[fn] = shard
+            nxt.ingest_timings.update(shard.ingest_timings)
+            if progress is not None:
+                progress(done, len(files), fn)
+        for fn in self.shards:
+            if fn not in nxt.shards and os.path.exists(self._shard_path(fn)):
+                os.remove(self._shard_path(fn))
+        return nxt
+
+    # Teilmenge der Shards (z. B. Policy-Set eines Mandanten) ohne Neuindexierung
+    def subset(self, files: List[str]) -> "ShardedPolicySearch":
+        view = object.__new__(ShardedPolicySearch)
+        view.__dict__.update(self.__dict__)
+        view.files = set(files)
+        view.shards = {fn: sh for fn, sh in self.shards.items() if fn in view.files}
+        view.ingest_timings = {fn: t for fn, t in self.ingest_timings.items() if fn in view.files}
+        view._pool = None
+        view._hit_cache = LRUCache(self._hit_cache.maxsize)
+        return view
+
+    def search(self, query: str, k: int = 7) -> List[PolicyHit]:
+        return self.search_many([query], k=k)[0]
+
+    def search_many(self, queries: List[str], k: int = 7) -> List[List[PolicyHit]]:
+        shards = list(self.shards.values())
+        if not shards or not queries:
+            return [[] for _ in queries]
+        keys = [_normalize_query(q) for q in queries]
+        results: List[Optional[List[PolicyHit]]] = [self._hit_cache.get((key, k)) for key in keys]
+        todo = [r for r, res in enumerate(results) if res is None]
+        if todo:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.search_threads)
+            todo_keys = [keys[r] for r in todo]
+            per_shard = list(self._pool.map(lambda sh: sh._ranked_many(todo_keys, k), shards))
+            for j, r in enumerate(todo):
+                # Erst (Score, Shard, Zeile) über alle Shards mischen, Auszüge nur für die endgültigen k
+                best = heapq.nlargest(k, (
+                    (score, s, row)
+                    for s, ranked in enumerate(per_shard)
+                    for row, score in zip(*ranked[j])
+                ), key=lambda t: t[0])
+                hits: List[PolicyHit] = []
+                for score, s, row in best:
+                    hits.extend(shards[s]._hits_for([row], [score], queries[r]))
+                results[r] = hits
+                self._hit_cache.put((keys[r], k), hits)
+        return [list(res) for res in results]
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        total = {"vectors": {"hits": 0, "misses": 0, "size": 0}, "hits": {"hits": 0, "misses": 0, "size": 0}}
+        for shard in self.shards.values():
+            for kind, stats in shard.cache_stats().items():
+                for key, val in stats.items():
+                    total[kind][key] += val
+        # Treffer werden nach dem Mischen zwischengespeichert, nicht je Shard
+        total["hits"] = self._hit_cache.stats()
+        return total
+
+    def list_files(self) -> List[str]:
+        return sorted(fn for fn, shard in self.shards.items() if shard.meta)
+
+    def memory_report(self) -> Dict[str, int]:
+        report = {"shared": 0, "private": 0}
+        for shard in self.shards.values():
+            for key, val in shard.memory_report().items():
+                report[key] += val
+        return report
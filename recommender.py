@@ -1,7 +1,11 @@
-from typing import List, Dict
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 import yaml
+from pydantic import BaseModel, ValidationError
 from policy_search import PolicySearch, PolicyHit
-from llm import chat
+from llm import chat, chat_stream, MODEL
+from llm_cache import cache_key, get_cache
 import re
 
 
@@ -102,7 +106,21 @@ def enrich_with_policies(
 ) -> List[PolicyHit]:
     query = build_query_for_policy(threat_name, vuln_name, asset_name)
     hits = search.search(query, k=k)
+    return _filter_hits(hits, vuln_name)
 
+
+# Wie enrich_with_policies, aber alle Schwachstellen in einem Suchdurchlauf
+def enrich_many_with_policies(
+    search: PolicySearch,
+    items: List[Tuple[str, str, str]],
+    k: int = 7
+) -> List[List[PolicyHit]]:
+    queries = [build_query_for_policy(threat, vuln, asset) for threat, vuln, asset in items]
+    all_hits = search.search_many(queries, k=k)
+    return [_filter_hits(hits, vuln) for (_, vuln, _), hits in zip(items, all_hits)]
+
+
+def _filter_hits(hits: List[PolicyHit], vuln_name: str) -> List[PolicyHit]:
     vuln_lower = (vuln_name or "").lower()
 
     is_awareness_vuln = any(word in vuln_lower for word in [
@@ -140,28 +158,23 @@ def llm_actions_from_policy_hits(
     hits: List[PolicyHit],
     risk_context: Dict[str, str],
     max_chars: int = 2000,
-    return_hits: bool = False
+    return_hits: bool = False,
+    timeout: Optional[float] = None
 ) -> str:
     if not hits:
         if return_hits:
             return ("ℹ️ Keine relevanten Policy-Dokumente gefunden.", [])
         return "ℹ️ Keine relevanten Policy-Dokumente gefunden."
     
-    all_policies = []
-    for h in hits:
-        file = getattr(h, "file", "Unbekannt")
-        page = getattr(h, "page", "?")
-        snippet = getattr(h, "snippet", "") or ""
-        all_policies.append({
-            "file": file,
-            "page": page,
-            "snippet": snippet
-        })
-    
-    policy_context = "\n\n".join([
-        f"**Quelle {i+1}:** {p['file']} (Seite {p['page']})\n{p['snippet']}"
-        for i, p in enumerate(all_policies)
-    ])
+    all_policies = _policy_entries(hits)
+    result_text = _lookup_actions(risk_context, all_policies)
+    if result_text is None:
+        result_text = _cached_chat(_actions_prompt(risk_context, all_policies), timeout=timeout, lookup=False)
+    return _finish_actions(result_text, all_policies, return_hits)
+
+
+def _actions_prompt(risk_context: Dict[str, str], all_policies: List[Dict]) -> str:
+    policy_context = _policy_context(all_policies)
     
     vuln = risk_context.get('vuln', 'Unbekannte Schwachstelle')
     threat = risk_context.get('threat', '')
@@ -212,11 +225,61 @@ HAUPTQUELLE: [1, 2, oder 3]
 
 **DEINE ANTWORT:**
 """
-    
-    msg = chat([{"role": "user", "content": prompt}], temperature=0.3)
-    result_text = msg.content.strip()
-    
+    return prompt
+
+
+def _policy_entries(hits: List[PolicyHit]) -> List[Dict]:
+    all_policies = []
+    for h in hits:
+        file = getattr(h, "file", "Unbekannt")
+        page = getattr(h, "page", "?")
+        snippet = getattr(h, "snippet", "") or ""
+        all_policies.append({
+            "file": file,
+            "page": page,
+            "snippet": snippet,
+            "alternates": list(getattr(h, "alternates", []) or [])
+        })
+    return all_policies
 
+
+def _policy_context(all_policies: List[Dict]) -> str:
+    return "\n\n".join([
+        f"**Quelle {i+1}:** {p['file']} (Seite {p['page']})\n{p['snippet']}"
+        for i, p in enumerate(all_policies)
+    ])
+
+
+# Gleicher Prompt (inkl. Auszüge), gleiches Modell, gleiche Temperatur -> Antwort aus dem Cache.
+# lookup=False nach einem Fehlgriff in _lookup_actions: nur fragen und speichern, nicht nochmal lesen
+def _cached_chat(prompt: str, temperature: float = 0.3, timeout: Optional[float] = None,
+                 lookup: bool = True) -> str:
+    cache = get_cache()
+    key = cache_key(prompt, MODEL, temperature)
+    result_text = cache.get(key) if cache and lookup else None
+    if result_text is None:
+        msg = chat([{"role": "user", "content": prompt}], temperature=temperature, timeout=timeout)
+        result_text = msg.content.strip()
+        if cache:
+            cache.put(key, MODEL, result_text)
+    return result_text
+
+
+# Gecachte Empfehlung unter dem Einzel-Prompt oder dem Sammel-Eintrag. Einzel-Anfrage, Streaming
+# und Sammel-Modus schreiben verschiedene Schlüssel; gelesen werden beide, damit Tab und
+# PDF-Export dieselben Antworten wiederverwenden.
+def _lookup_actions(risk_context: Dict[str, str], all_policies: List[Dict],
+                    temperature: float = 0.3) -> Optional[str]:
+    cache = get_cache()
+    if not cache:
+        return None
+    prompts = (_actions_prompt(risk_context, all_policies),
+               f"{BATCH_PROMPT_VERSION}\n{_batch_item_body(risk_context, all_policies)}")
+    return cache.get_any([cache_key(prompt, MODEL, temperature) for prompt in prompts])
+
+
+# Antworttext mit "HAUPTQUELLE: n"-Trailer in Empfehlung + Hauptquelle zerlegen
+def _finish_actions(result_text: str, all_policies: List[Dict], return_hits: bool):
     main_source_idx = 0 
     if "HAUPTQUELLE:" in result_text:
         parts = result_text.split("HAUPTQUELLE:")
@@ -243,3 +306,236 @@ HAUPTQUELLE: [1, 2, oder 3]
         result_text += source_section
     
     return result_text
+
+
+# Empfehlungs-Tab: erste fehlende Empfehlung streamen, die übrigen parallel im Hintergrund
+# erzeugen (1), oder alle gesammelt/parallel vorab erzeugen (0). Der Durchsatz ist in beiden
+# Fällen der des parallelen Sammel-Modus; gestreamt wird nur eine Empfehlung pro Durchlauf.
+LLM_STREAM = os.getenv("LLM_STREAM", "1") == "1"
+
+# Zeichen, die beim Streamen zurückgehalten werden, bis klar ist, ob der HAUPTQUELLE-Trailer beginnt
+STREAM_HOLDBACK = 24
+
+
+# Streaming-Variante von llm_actions_from_policy_hits (return_hits=True) für st.write_stream:
+# liefert die Empfehlung stückweise ohne den "---/HAUPTQUELLE"-Trailer. Nach dem Ende des
+# Streams liegt die vollständige Antwort im Cache und (Text, Hauptquelle) in .result.
+class ActionStream:
+    def __init__(self, hits: List[PolicyHit], risk_context: Dict[str, str], timeout: Optional[float] = None):
+        self.hits = hits
+        self.risk_context = risk_context
+        self.timeout = timeout
+        self.result: Optional[Tuple[str, Optional[Dict]]] = None
+
+    def __iter__(self):
+        if not self.hits:
+            self.result = llm_actions_from_policy_hits(self.hits, self.risk_context, return_hits=True)
+            yield self.result[0]
+            return
+        all_policies = _policy_entries(self.hits)
+        prompt = _actions_prompt(self.risk_context, all_policies)
+        temperature = 0.3
+        full = _lookup_actions(self.risk_context, all_policies, temperature)
+        emitted = 0
+        if full is None:
+            full = ""
+            deltas = chat_stream([{"role": "user", "content": prompt}], temperature=temperature,
+                                 timeout=self.timeout)
+            for delta in deltas:
+                full += delta
+                text = full.lstrip()
+                cut = text.find("HAUPTQUELLE:")
+                if cut >= 0:
+                    visible = text[:cut].rstrip().rstrip("-").rstrip()
+                else:
+                    visible = text[:max(0, len(text) - STREAM_HOLDBACK)]
+                if len(visible) > emitted:
+                    yield visible[emitted:]
+                    emitted = len(visible)
+            full = full.strip()
+            cache = get_cache()
+            if cache:
+                cache.put(cache_key(prompt, MODEL, temperature), MODEL, full)
+        self.result = _finish_actions(full, all_policies, True)
+        if len(self.result[0]) > emitted:
+            yield self.result[0][emitted:]
+
+
+# Parallele LLM-Anfragen (Thread-Pool, begrenzt über LLM_MAX_CONCURRENCY)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4") or 4)
+# Sekunden pro Anfrage
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60") or 60)
+
+
+# Wie llm_actions_from_policy_hits für viele (hits, risk_context)-Paare gleichzeitig.
+# Ergebnisse in Eingabereihenfolge; eine fehlgeschlagene Anfrage liefert None nur für ihren Eintrag.
+# Mit batch_size > 1 (Standard LLM_BATCH_SIZE) gehen mehrere Schwachstellen pro Anfrage raus.
+def llm_actions_many(
+    requests: List[Tuple[List[PolicyHit], Dict[str, str]]],
+    max_chars: int = 2000,
+    return_hits: bool = False,
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    batch_size: Optional[int] = None
+) -> list:
+    if not requests:
+        return []
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+
+    def _one(req):
+        hits, ctx = req
+        try:
+            return llm_actions_from_policy_hits(hits, ctx, max_chars=max_chars,
+                                                return_hits=return_hits, timeout=timeout)
+        except Exception as e:
+            print(f"⚠️ Empfehlung für {ctx.get('vuln', '?')} fehlgeschlagen: {e}")
+            return None
+
+    def _batch(chunk):
+        try:
+            return llm_actions_batch(chunk, max_chars=max_chars, return_hits=return_hits, timeout=timeout)
+        except Exception as e:
+            print(f"⚠️ Sammel-Anfrage für {len(chunk)} Schwachstellen fehlgeschlagen: {e}")
+            return [None] * len(chunk)
+
+    batch_size = LLM_BATCH_SIZE if batch_size is None else batch_size
+    if batch_size > 1:
+        jobs = [requests[i:i + batch_size] for i in range(0, len(requests), batch_size)]
+        fn = _batch
+    else:
+        jobs, fn = requests, _one
+    workers = max(1, min(max_workers or LLM_MAX_CONCURRENCY, len(jobs)))
+    if workers == 1:
+        results = [fn(job) for job in jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(fn, jobs))
+    if batch_size > 1:
+        return [res for chunk in results for res in chunk]
+    return results
+
+
+# Sammel-Modus: mehrere Schwachstellen pro Anfrage (LLM_BATCH_SIZE, 1 = aus). Die Regeln stehen
+# nur einmal im Prompt, die Antwort ist ein JSON-Objekt mit einem Array "empfehlungen".
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "5") or 5)
+
+# Fließt in die Cache-Schlüssel ein; bei Änderungen am Sammel-Prompt erhöhen
+BATCH_PROMPT_VERSION = "batch-v1"
+
+
+class BatchRecommendation(BaseModel):
+    nr: int
+    titel: str
+    warum: str
+    schritte: List[str]
+    hauptquelle: int
+    hinweis: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    empfehlungen: List[BatchRecommendation]
+
+
+BATCH_PROMPT = """Du bist ein Experte für Cybersicherheits-Risikomanagement in KMU.
+
+**AUFGABE:**
+Unten stehen mehrere Schwachstellen (SCHWACHSTELLE 1, 2, ...), jeweils mit eigenem Kontext und eigenen Policy-Auszügen. Erstelle für JEDE Schwachstelle **GENAU EINE ganzheitliche Handlungsempfehlung**, ausschließlich auf Basis IHRER Quellen.
+
+**WICHTIGE REGELN:**
+1. **Quellen-Treue**: Jede Empfehlung muss STRENG auf den Inhalten der zugehörigen `POLICY-QUELLEN` basieren. Nutze konkrete Vorgaben aus diesen Texten.
+2. **KEINE Quellenangaben im Text**: Schreibe KEINE Quellenverweise wie "vgl. Dokument, S. X". Die Quelle wird automatisch angezeigt.
+3. **Keine Erfindungen**: Erfinde keine technischen Details, Systeme oder Prozesse, die nicht in den Quellen erwähnt werden. Wenn die Quellen vage sind, bleibe auf diesem Abstraktionsniveau.
+4. **Fokus**: Bleibe je Empfehlung STRENG beim Thema ihrer Schwachstelle.
+5. **Umsetzungsplan**: 3-4 logische Schritte, die sich direkt aus den Richtlinien ableiten lassen.
+6. **Fallback**: Enthalten die Quellen keine relevanten Informationen, setze "hinweis" auf "Hinweis: In den vorliegenden Richtlinien wurden keine spezifischen Vorgaben zu diesem Thema gefunden. Die folgende Empfehlung basiert auf allgemeinen Best Practices." (sonst null).
+7. **Hauptquelle**: "hauptquelle" ist die Nummer der Quelle dieser Schwachstelle, die die KERNAUSSAGE der Empfehlung enthält.
+
+**FORMAT (nur JSON, keine weiteren Texte):**
+{"empfehlungen": [{"nr": <Nummer der Schwachstelle>, "titel": "<Titel der Maßnahme>", "warum": "<2-3 Sätze zur Risikoreduktion>", "schritte": ["<Schritt>", "..."], "hauptquelle": <Nummer der Quelle>, "hinweis": null}]}
+Genau ein Eintrag pro Schwachstelle.
+
+"""
+
+
+def _batch_item_body(risk_context: Dict[str, str], all_policies: List[Dict]) -> str:
+    return f"""**KONTEXT:**
+- Schwachstelle: {risk_context.get('vuln', 'Unbekannte Schwachstelle')}
+- Relevante Bedrohung: {risk_context.get('threat', '')}
+- Asset: {risk_context.get('asset', '')}
+- Risikoscore: {risk_context.get('risk', 0)}/5
+
+**POLICY-QUELLEN:**
+{_policy_context(all_policies)}
+"""
+
+
+# Strukturierte Empfehlung im Format der Einzel-Anfrage (inkl. HAUPTQUELLE-Trailer)
+def _render_batch_item(rec: BatchRecommendation) -> str:
+    md = f"### {rec.titel.strip()}\n\n"
+    if rec.hinweis:
+        md += f"{rec.hinweis.strip()}\n\n"
+    md += f"**Warum ist das wichtig?**\n{rec.warum.strip()}\n\n**Umsetzungsplan:**\n"
+    md += "\n".join(f"{i}. {step.strip()}" for i, step in enumerate(rec.schritte, 1))
+    return f"{md}\n\n---\nHAUPTQUELLE: {rec.hauptquelle}"
+
+
+# Mehrere (hits, risk_context)-Paare in einer Anfrage. Bereits gecachte Einträge werden nicht
+# gesendet; fehlt ein Eintrag in der Antwort, ist sie ungültig oder schlägt die Anfrage fehl,
+# wird einzeln nachgefragt.
+def llm_actions_batch(
+    requests: List[Tuple[List[PolicyHit], Dict[str, str]]],
+    max_chars: int = 2000,
+    return_hits: bool = False,
+    timeout: Optional[float] = None
+) -> list:
+    temperature = 0.3
+    cache = get_cache()
+    results: list = [None] * len(requests)
+    todo = []
+    for i, (hits, ctx) in enumerate(requests):
+        if not hits:
+            results[i] = llm_actions_from_policy_hits(hits, ctx, return_hits=return_hits)
+            continue
+        all_policies = _policy_entries(hits)
+        body = _batch_item_body(ctx, all_policies)
+        key = cache_key(f"{BATCH_PROMPT_VERSION}\n{body}", MODEL, temperature)
+        cached = _lookup_actions(ctx, all_policies, temperature)
+        if cached is not None:
+            results[i] = _finish_actions(cached, all_policies, return_hits)
+        else:
+            todo.append((i, all_policies, body, key))
+    if not todo:
+        return results
+
+    prompt = BATCH_PROMPT + "\n".join(
+        f"### SCHWACHSTELLE {nr}\n{body}" for nr, (_, _, body, _) in enumerate(todo, 1)
+    ) + "\n**DEINE ANTWORT (JSON):**\n"
+    # Fehlgeschlagene Sammel-Anfrage wie ungültige Antwort behandeln: die gecachten
+    # Einträge bleiben erhalten, der Rest wird einzeln nachgefragt
+    try:
+        msg = chat([{"role": "user", "content": prompt}], temperature=temperature, timeout=timeout,
+                   response_format={"type": "json_object"})
+        by_nr = {rec.nr: rec for rec in BatchResponse.model_validate_json(msg.content).empfehlungen}
+    except ValidationError as e:
+        print(f"⚠️ Ungültige Sammel-Antwort ({e.error_count()} Fehler), frage einzeln nach.")
+        by_nr = {}
+    except Exception as e:
+        print(f"⚠️ Sammel-Anfrage für {len(todo)} Schwachstellen fehlgeschlagen ({e}), frage einzeln nach.")
+        by_nr = {}
+
+    for nr, (i, all_policies, _, key) in enumerate(todo, 1):
+        rec = by_nr.get(nr)
+        if rec is None or not rec.schritte:
+            ctx = requests[i][1]
+            # Cache wurde oben schon geprüft -> direkt einzeln fragen
+            try:
+                text = _cached_chat(_actions_prompt(ctx, all_policies), temperature, timeout=timeout, lookup=False)
+                results[i] = _finish_actions(text, all_policies, return_hits)
+            except Exception as e:
+                print(f"⚠️ Empfehlung für {ctx.get('vuln', '?')} fehlgeschlagen: {e}")
+            continue
+        text = _render_batch_item(rec)
+        if cache:
+            cache.put(key, MODEL, text)
+        results[i] = _finish_actions(text, all_policies, return_hits)
+    return results